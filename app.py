@@ -1,7 +1,15 @@
+import os
 import streamlit as st
 import logging
+from datetime import date
+from src.analysis_memo import get_analysis_memo
 from src.database import DatabaseManager
-from src.chatbot import LanguageLearningChatbot
+from src.idempotency import get_ttl_map, session_idempotency_key
+from src.chatbot import get_chatbot
+from src.conversation import ConversationSession, ConversationStore
+from src.mistakes import MistakeStore
+from src.vocabulary import REVIEW_GRADES, VocabularyStore
+from src.metrics import metrics, start_metrics_server
 
 def configure_logging():
     """Configure application-wide logging"""
@@ -14,7 +22,154 @@ def configure_logging():
         ]
     )
 
+def export_metrics():
+    """Expose metrics over HTTP (METRICS_PORT) or as a file (METRICS_FILE)"""
+    if os.getenv("METRICS_PORT"):
+        start_metrics_server(int(os.getenv("METRICS_PORT")))
+    if os.getenv("METRICS_FILE"):
+        metrics.write_prometheus(os.getenv("METRICS_FILE"))
+
+def show_debug_panel(chatbot):
+    """Per-stage timings of the most recent reruns"""
+    if not st.sidebar.checkbox("Show timings", key="show_timings"):
+        return
+    breaker_stats = chatbot.breaker.snapshot()
+    st.sidebar.caption(
+        f"LLM circuit: {breaker_stats['state']} "
+        f"({breaker_stats['failures_in_window']}/{breaker_stats['calls_in_window']} recent calls failed)"
+    )
+    memo_stats = get_analysis_memo().stats()
+    st.sidebar.caption(
+        f"Analysis memo: {memo_stats['hit_rate']:.0%} hit rate "
+        f"({memo_stats['hits']} exact, {memo_stats['near_hits']} near, {memo_stats['misses']} misses)"
+    )
+    for trace in metrics.recent_traces()[:5]:
+        with st.sidebar.expander(f"{trace['name']} at {trace['started_at']} - {trace['total_ms']} ms"):
+            st.table([
+                {"stage": stage, "ms": elapsed_ms, "failed": failed}
+                for stage, elapsed_ms, failed in trace["stages"]
+            ])
+
+def chart_counts(rows, label):
+    """Chart data from (name, count) rows"""
+    return {label: {name: int(count) for name, count in rows}}
+
+def show_analytics(db_manager):
+    """Dashboard of sessions, learners and mistakes over the last 30 days"""
+    analytics = db_manager.get_analytics(days=30)
+    if not analytics:
+        return
+
+    st.header("📈 Learning Analytics (last 30 days)")
+    daily_activity = analytics["daily_activity"]
+    total_col, learners_col = st.columns(2)
+    total_col.metric("Sessions", sum(int(sessions) for _, sessions, _ in daily_activity))
+    learners_col.metric(
+        "Active learners today",
+        daily_activity[-1][2] if daily_activity and daily_activity[-1][0] == date.today() else 0
+    )
+
+    if daily_activity:
+        st.write("#### Daily active learners")
+        st.line_chart({"learners": {str(day): learners for day, _, learners in daily_activity}})
+
+    language_col, level_col = st.columns(2)
+    with language_col:
+        st.write("#### Sessions per language")
+        st.bar_chart(chart_counts(analytics["sessions_per_language"], "sessions"))
+    with level_col:
+        st.write("#### Level mix")
+        st.bar_chart(chart_counts(analytics["level_mix"], "sessions"))
+
+    st.write("#### Language pairs")
+    st.table([
+        {"native": native, "learning": learning, "sessions": int(sessions)}
+        for native, learning, sessions in analytics["language_pairs"]
+    ])
+
+    if analytics["mistake_types"]:
+        st.write("#### Most common mistakes")
+        st.bar_chart(chart_counts(analytics["mistake_types"], "mistakes"))
+
+def show_conversation(chatbot, db_manager, learning_session):
+    """Chat with a conversation partner; older turns are summarized"""
+    logger = logging.getLogger(__name__)
+    session_id = learning_session["session_id"]
+    conversation = st.session_state.get("conversation")
+    if conversation is None or conversation.session_id != session_id:
+        store = ConversationStore(db_manager) if session_id and db_manager.is_connected else None
+        try:
+            conversation = ConversationSession(
+                chatbot, learning_session["learning_language"], learning_session["proficiency_level"],
+                session_id=session_id, store=store
+            )
+        except Exception as e:
+            logger.error(f"Conversation load error: {e}")
+            conversation = ConversationSession(
+                chatbot, learning_session["learning_language"], learning_session["proficiency_level"]
+            )
+        st.session_state["conversation"] = conversation
+    conversation.chatbot = chatbot
+
+    st.write(f"### 💬 Conversation Practice in {learning_session['learning_language']}")
+    if conversation.summary:
+        with st.expander(f"Earlier in this conversation ({conversation.summarized_turns} turns)"):
+            st.write(conversation.summary)
+    for role, content in conversation.turns:
+        st.chat_message(role).write(content)
+
+    message = st.chat_input(f"Say something in {learning_session['learning_language']}")
+    if message:
+        st.chat_message("user").write(message)
+        try:
+            with metrics.span("render_conversation"), st.chat_message("assistant"):
+                st.write_stream(conversation.stream_reply(message))
+        except Exception as e:
+            st.error(f"Unable to reply. Please try again. Error: {e}")
+            logger.error(f"Conversation error: {e}")
+
+def show_vocabulary_review(db_manager, learning_session):
+    """Review due vocabulary cards (scheduled locally, no model calls)"""
+    vocabulary = VocabularyStore(db_manager)
+    owner = (learning_session["user_name"], learning_session["learning_language"])
+    review = st.session_state.get("vocabulary_review")
+    if not review or review["owner"] != owner:
+        review = {"owner": owner, "cards": [], "revealed": False}
+        st.session_state["vocabulary_review"] = review
+    if not review["cards"]:
+        review["cards"] = vocabulary.due_cards(*owner)
+        review["revealed"] = False
+
+    st.write("### 🃏 Vocabulary Review")
+    if not review["cards"]:
+        st.info("No vocabulary due for review. Come back later!")
+        return
+
+    card = review["cards"][0]
+    st.write(f"**{card.term}** ({len(review['cards'])} due)")
+    if not review["revealed"]:
+        if st.button("Show meaning"):
+            review["revealed"] = True
+            st.rerun()
+        return
+
+    st.write(card.meaning)
+    for column, (grade, quality) in zip(st.columns(len(REVIEW_GRADES)), REVIEW_GRADES.items()):
+        if column.button(grade, key=f"review_grade_{grade}"):
+            vocabulary.review(card.id, quality)
+            review["cards"].pop(0)
+            review["revealed"] = False
+            st.rerun()
+
 def main():
+    # Time every stage of this rerun (st.rerun() ends it with an exception)
+    try:
+        with metrics.trace("rerun"):
+            run_app()
+    finally:
+        export_metrics()
+
+def run_app():
     # Configure logging
     configure_logging()
     logger = logging.getLogger(__name__)
@@ -51,8 +206,8 @@ def main():
 
     # Initialize components with error handling
     try:
-        # Initialize Chatbot
-        chatbot = LanguageLearningChatbot(api_key=gemini_api_key)
+        # Reuse the process-wide chatbot for this key (no network calls)
+        chatbot = get_chatbot(api_key=gemini_api_key)
         
         # Initialize Database
         db_manager = DatabaseManager(**db_config)
@@ -61,6 +216,13 @@ def main():
         logger.error(f"System initialization failed: {e}")
         return
 
+    # Connection test only on demand; the result is cached for all reruns
+    if st.sidebar.button("Test Connection"):
+        if chatbot.check_connection(force=True):
+            st.sidebar.success(f"Connected with model: {chatbot.model_name}")
+        else:
+            st.sidebar.error("Could not reach any Gemini model. Please check your API key.")
+
     # Language configuration
     languages = chatbot.SUPPORTED_LANGUAGES
     levels = ['Beginner', 'Intermediate', 'Advanced']
@@ -89,28 +251,143 @@ def main():
             st.warning("Please fill in all fields and provide a valid API key")
         else:
             try:
-                # Save session to database
+                # Save session to database (a resubmitted form reuses the session)
+                idempotency_key = session_idempotency_key(name, learn_lang, native_lang, proficiency)
                 session_id = db_manager.create_session(
-                    name, learn_lang, native_lang, proficiency
+                    name, learn_lang, native_lang, proficiency, idempotency_key=idempotency_key
                 )
                 
-                # Generate conversation scenario
-                conversation = chatbot.generate_conversation_scene(learn_lang, proficiency)
-                
-                # Display results
+                # Display results while the scenario streams in
                 st.success(f"Welcome, {name}! Let's learn {learn_lang}")
                 st.subheader(f"{learn_lang} Learning Scenario")
-                st.write(conversation)
+                session_scenes = get_ttl_map("session_scenes")
+                conversation = session_scenes.get(idempotency_key)
+                new_scene = conversation is None
+                complete_scene = False
+                with metrics.span("render_scene"):
+                    if new_scene:
+                        streamed = {}
+
+                        def stream_scene():
+                            # Keep the generator's (scene, complete) return value
+                            streamed["result"] = yield from chatbot.stream_conversation_scene(learn_lang, proficiency)
+
+                        conversation = st.write_stream(stream_scene())
+                        # Errors and fallback scenes are not kept, so a retry asks the model again
+                        complete_scene = streamed.get("result", (None, False))[1]
+                        if complete_scene:
+                            session_scenes.put(idempotency_key, conversation)
+                    else:
+                        st.markdown(conversation)
+
+                # Keep the session around for practice across reruns
+                st.session_state["learning_session"] = {
+                    "session_id": session_id,
+                    "user_name": name,
+                    "learning_language": learn_lang,
+                    "proficiency_level": proficiency,
+                    "conversation": conversation
+                }
+
+                # Turn the scene's Key Vocabulary into review cards
+                if session_id and complete_scene:
+                    try:
+                        VocabularyStore(db_manager).add_from_scene(session_id, name, learn_lang, conversation)
+                    except Exception as e:
+                        logger.error(f"Vocabulary card error: {e}")
             
             except Exception as e:
                 st.error(f"Error processing your request: {e}")
                 logger.error(f"Learning session error: {e}")
+    elif "learning_session" in st.session_state:
+        learning_session = st.session_state["learning_session"]
+        st.subheader(f"{learning_session['learning_language']} Learning Scenario")
+        st.write(learning_session["conversation"])
+
+    # Practice with structured feedback
+    learning_session = st.session_state.get("learning_session")
+    if learning_session:
+        practice_language = learning_session["learning_language"]
+        with st.form("practice_form"):
+            st.write(f"### ✍️ Practice Your {practice_language}")
+            user_input = st.text_area(f"Write a sentence in {practice_language}", key="practice_input")
+            analyze = st.form_submit_button("Analyze")
+
+        if analyze and user_input:
+            st.subheader("📖 Feedback")
+            feedback = {}
+
+            def stream_feedback():
+                # Keep the generator's (analysis, text) return value
+                feedback["result"] = yield from chatbot.stream_user_input_analysis(user_input, practice_language)
+
+            try:
+                with metrics.span("render_analysis"):
+                    st.write_stream(stream_feedback())
+            except Exception as e:
+                st.error(f"Unable to analyze input. Please try again. Error: {e}")
+                logger.error(f"Input analysis error: {e}")
+            else:
+                analysis = feedback.get("result", (None, ""))[0]
+                # Rule-based checks and answers for similar sentences are not
+                # counted in the mistake statistics
+                if (analysis is not None and learning_session["session_id"] and db_manager.is_connected
+                        and not analysis.offline and not analysis.approximate):
+                    try:
+                        mistake_store = MistakeStore(db_manager)
+                        mistake_store.record(learning_session["session_id"], analysis.mistakes)
+                        top_types = mistake_store.top_mistake_types(session_id=learning_session["session_id"])
+                        if top_types:
+                            st.caption("Your most frequent mistakes this session: " + ", ".join(
+                                f"{mistake_type.replace('_', ' ')} ({count})" for mistake_type, count in top_types
+                            ))
+                    except Exception as e:
+                        logger.error(f"Mistake recording error: {e}")
+
+    # Multi-turn conversation in the learning language
+    if learning_session:
+        show_conversation(chatbot, db_manager, learning_session)
+
+    # Spaced-repetition review of earlier vocabulary
+    if learning_session and db_manager.is_connected:
+        try:
+            show_vocabulary_review(db_manager, learning_session)
+        except Exception as e:
+            logger.error(f"Vocabulary review error: {e}")
+
+    # Learning analytics from the summary tables
+    st.sidebar.subheader("📈 Learning Analytics")
+    if st.sidebar.button("View Analytics"):
+        st.session_state["show_analytics"] = True
+
+    if st.session_state.get("show_analytics"):
+        with metrics.span("render_analytics"):
+            show_analytics(db_manager)
+
+    # Timings of earlier reruns (this one is still running)
+    st.sidebar.subheader("⏱️ Performance")
+    show_debug_panel(chatbot)
 
     # Sessions overview
     st.sidebar.subheader("📊 Learning Sessions")
     if st.sidebar.button("View Sessions"):
-        sessions = db_manager.get_sessions(limit=50)
+        # Stack of page cursors; None is the newest page
+        st.session_state["session_pages"] = [None]
+
+    session_pages = st.session_state.get("session_pages")
+    if session_pages:
+        sessions, next_cursor = db_manager.get_sessions_page(limit=50, cursor=session_pages[-1])
         st.dataframe(sessions)
 
+        newer_col, older_col = st.columns(2)
+        with newer_col:
+            if len(session_pages) > 1 and st.button("⬅️ Newer"):
+                session_pages.pop()
+                st.rerun()
+        with older_col:
+            if next_cursor and st.button("Older ➡️"):
+                session_pages.append(next_cursor)
+                st.rerun()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
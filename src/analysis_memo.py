@@ -0,0 +1,179 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from src.metrics import metrics
+from src.similarity import MinHasher, MinHashLSH, exact_text, jaccard, normalize_text, shingles
+
+# Process-wide memo shared by every chatbot
+_memo = None
+_memo_lock = threading.Lock()
+
+
+def get_analysis_memo(**options):
+    """
+    Return the process-wide analysis memo
+
+    Args:
+        **options: AnalysisMemo settings used on first creation
+    """
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            _memo = AnalysisMemo(**options)
+        return _memo
+
+
+class AnalysisMemo:
+    """
+    In-memory LRU of input analyses keyed by (learning_language, exact text)
+
+    Lookups try the exact sentence (up to Unicode form and whitespace,
+    see ``exact_text``) first, then (only when
+    ``similarity_threshold`` is below 1.0) near-duplicates found through a
+    MinHash LSH index over character shingles and confirmed with their
+    exact Jaccard similarity over case- and punctuation-folded text.
+    Near-duplicates are off by default, and no signatures are built then:
+    for a grammar check, a one-character difference is usually the mistake.
+    Entries expire after ``ttl`` and the least recently used ones are
+    evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries=5000, ttl=24 * 3600, similarity_threshold=1.0,
+                 shingle_size=3, num_perm=64, bands=8):
+        """
+        Args:
+            max_entries (int): Analyses kept
+            ttl (int): Seconds before an analysis expires
+            similarity_threshold (float): Jaccard similarity needed for a
+                near-duplicate hit (1.0 disables near-duplicate lookups)
+            shingle_size (int): Characters per shingle
+            num_perm (int): MinHash signature length
+            bands (int): LSH bands (fewer bands, stricter candidates)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.shingle_size = shingle_size
+        self._hasher = MinHasher(num_perm)
+        self._index = MinHashLSH(num_perm, bands)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def near_duplicates(self):
+        """
+        Whether near-duplicate lookups are enabled
+        """
+        return self.similarity_threshold < 1.0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        if entry['signature'] is not None:
+            self._index.remove(key, entry['signature'])
+
+    def _fresh(self, key, now):
+        """
+        Entry for a key, dropping it if expired
+        """
+        entry = self._entries.get(key)
+        if entry is not None and now - entry['created_at'] > self.ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def get(self, learning_language, text):
+        """
+        Look up an analysis for a sentence
+
+        Returns:
+            The stored value, or None on a miss
+        """
+        return self.lookup(learning_language, text)[0]
+
+    def lookup(self, learning_language, text):
+        """
+        Look up an analysis for a sentence, telling exact and near hits apart
+
+        Returns:
+            tuple: (stored value or None, 'exact_hit', 'near_hit' or 'miss')
+        """
+        key = (learning_language, exact_text(text))
+        now = time.time()
+        with self._lock:
+            entry = self._fresh(key, now)
+            result = 'exact_hit' if entry is not None else 'miss'
+
+            if entry is None and self.near_duplicates:
+                text_shingles = shingles(normalize_text(text), self.shingle_size)
+                best_similarity = self.similarity_threshold
+                for candidate in self._index.query(self._hasher.signature(text_shingles)):
+                    if candidate[0] != learning_language:
+                        continue
+                    candidate_entry = self._fresh(candidate, now)
+                    if candidate_entry is None or candidate_entry['shingles'] is None:
+                        continue
+                    similarity = jaccard(text_shingles, candidate_entry['shingles'])
+                    if similarity >= best_similarity:
+                        best_similarity, key, entry = similarity, candidate, candidate_entry
+                        result = 'near_hit'
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                if result == 'exact_hit':
+                    self.hits += 1
+                else:
+                    self.near_hits += 1
+
+        metrics.increment('cache_requests_total', cache='analysis', result=result)
+        return (entry['value'] if entry is not None else None), result
+
+    def put(self, learning_language, text, value):
+        """
+        Store the analysis of a sentence
+        """
+        key = (learning_language, exact_text(text))
+        text_shingles = signature = None
+        if self.near_duplicates:
+            text_shingles = shingles(normalize_text(text), self.shingle_size)
+            signature = self._hasher.signature(text_shingles)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                'value': value,
+                'shingles': text_shingles,
+                'signature': signature,
+                'created_at': time.time()
+            }
+            if signature is not None:
+                self._index.insert(key, signature)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+                metrics.increment('cache_evictions_total', cache='analysis')
+
+    def stats(self):
+        """
+        Snapshot of the memo counters
+
+        Returns:
+            dict: Counter values and the overall hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,153 @@
+import logging
+from collections import Counter
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Sessions per day and (learning, native, level) combination
+SESSION_STATS_UPSERT = '''
+INSERT INTO session_stats_daily
+(day, learning_language, native_language, proficiency_level, sessions)
+VALUES (CURRENT_DATE, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE sessions = sessions + VALUES(sessions)
+'''
+
+# One row per learner per day; new rows count towards daily active learners
+LEARNER_DAY_INSERT = "INSERT IGNORE INTO learner_days (day, user_name) VALUES (CURRENT_DATE, %s)"
+
+DAILY_ACTIVITY_UPSERT = '''
+INSERT INTO daily_activity (day, sessions, active_learners)
+VALUES (CURRENT_DATE, %s, %s)
+ON DUPLICATE KEY UPDATE
+    sessions = sessions + VALUES(sessions),
+    active_learners = active_learners + VALUES(active_learners)
+'''
+
+MISTAKE_WATERMARK = 'language_mistakes'
+
+# Age (seconds) a mistake row needs before the watermark may pass it
+MISTAKE_SETTLE_SECONDS = 60
+
+
+def record_sessions(cursor, sessions):
+    """
+    Add new sessions to the summary tables, in the caller's transaction
+
+    Args:
+        cursor: Cursor on the connection that inserts the sessions
+        sessions (list): (user_name, learning_language, native_language,
+            proficiency_level) tuples
+    """
+    if not sessions:
+        return
+
+    combinations = Counter(tuple(session[1:4]) for session in sessions)
+    cursor.executemany(
+        SESSION_STATS_UPSERT,
+        [combination + (count,) for combination, count in combinations.items()]
+    )
+
+    learners = sorted({session[0] for session in sessions})
+    cursor.executemany(LEARNER_DAY_INSERT, [(learner,) for learner in learners])
+    new_learners = max(cursor.rowcount or 0, 0)
+    cursor.execute(DAILY_ACTIVITY_UPSERT, (len(sessions), new_learners))
+
+
+def refresh_mistake_stats(connection, settle_seconds=MISTAKE_SETTLE_SECONDS):
+    """
+    Fold mistakes added since the last run into ``mistake_type_counts_daily``
+
+    Only rows above the stored high-water mark are read (a primary key range
+    scan), and the mark row is locked so concurrent refreshes do not double
+    count. The mark stops at the newest row older than ``settle_seconds``:
+    ids are taken at insert but rows appear at commit, so a row committed
+    late below a newer id is folded on a later run instead of skipped.
+
+    Returns:
+        int: Mistakes folded in
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "INSERT IGNORE INTO analytics_watermarks (name, last_id) VALUES (%s, 0)",
+            (MISTAKE_WATERMARK,)
+        )
+        cursor.execute(
+            "SELECT last_id FROM analytics_watermarks WHERE name = %s FOR UPDATE",
+            (MISTAKE_WATERMARK,)
+        )
+        last_id = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT COALESCE(MAX(mistake_id), %s) FROM language_mistakes
+            WHERE mistake_id > %s AND created_at <= NOW() - INTERVAL %s SECOND
+        ''', (last_id, last_id, settle_seconds))
+        high_id = cursor.fetchone()[0]
+        if high_id <= last_id:
+            connection.commit()
+            return 0
+
+        cursor.execute('''
+            SELECT DATE(m.created_at), s.learning_language, COALESCE(m.mistake_type, 'other'), COUNT(*)
+            FROM language_mistakes m
+            JOIN user_sessions s ON s.id = m.session_id
+            WHERE m.mistake_id > %s AND m.mistake_id <= %s
+            GROUP BY DATE(m.created_at), s.learning_language, COALESCE(m.mistake_type, 'other')
+        ''', (last_id, high_id))
+        deltas = cursor.fetchall()
+        if deltas:
+            cursor.executemany('''
+                INSERT INTO mistake_type_counts_daily (day, learning_language, mistake_type, mistakes)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE mistakes = mistakes + VALUES(mistakes)
+            ''', deltas)
+        cursor.execute(
+            "UPDATE analytics_watermarks SET last_id = %s WHERE name = %s",
+            (high_id, MISTAKE_WATERMARK)
+        )
+        connection.commit()
+        folded = sum(row[3] for row in deltas)
+        if folded:
+            logger.info(f"Folded {folded} mistakes into mistake_type_counts_daily")
+        return folded
+    finally:
+        cursor.close()
+
+
+def learning_summary(cursor, days=30):
+    """
+    Dashboard figures read from the summary tables only
+
+    Args:
+        cursor: Cursor returning tuples
+        days (int): Days of history to cover
+
+    Returns:
+        dict: Lists of (label, count) pairs plus daily activity rows
+    """
+    since = date.today() - timedelta(days=days - 1)
+
+    def grouped(columns):
+        cursor.execute(f'''
+            SELECT {columns}, SUM(sessions) AS total FROM session_stats_daily
+            WHERE day >= %s GROUP BY {columns} ORDER BY total DESC
+        ''', (since,))
+        return cursor.fetchall()
+
+    summary = {
+        'sessions_per_language': grouped('learning_language'),
+        'level_mix': grouped('proficiency_level'),
+        'language_pairs': grouped('native_language, learning_language')
+    }
+
+    cursor.execute(
+        "SELECT day, sessions, active_learners FROM daily_activity WHERE day >= %s ORDER BY day",
+        (since,)
+    )
+    summary['daily_activity'] = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT mistake_type, SUM(mistakes) AS total FROM mistake_type_counts_daily
+        WHERE day >= %s GROUP BY mistake_type ORDER BY total DESC LIMIT 10
+    ''', (since,))
+    summary['mistake_types'] = cursor.fetchall()
+    return summary
@@ -0,0 +1,404 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from src.chatbot import LanguageLearningChatbot, get_chatbot
+from src.metrics import metrics
+from src.providers import StubProvider, canned_response
+from src.similarity import exact_text
+
+# Largest request body accepted (bytes)
+MAX_BODY_BYTES = 16 * 1024
+
+# Largest request line or header block accepted (bytes)
+MAX_HEADER_BYTES = 8 * 1024
+
+
+class HTTPError(Exception):
+    """
+    Error answered with an HTTP status and a JSON message
+    """
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight work
+
+    The first caller for a key starts the work; callers arriving while it
+    runs await the same result instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _finished(self, key, future):
+        self._calls.pop(key, None)
+        if not future.cancelled():
+            # Mark the error as retrieved even if every waiter gave up
+            future.exception()
+
+    async def do(self, key, factory):
+        """
+        Run ``factory()`` once per key at a time and share its result
+
+        Args:
+            key (tuple): Identity of the work; the first item labels metrics
+            factory (callable): Returns the awaitable doing the work
+        """
+        future = self._calls.get(key)
+        if future is None:
+            self.started += 1
+            future = asyncio.ensure_future(factory())
+            self._calls[key] = future
+            future.add_done_callback(functools.partial(self._finished, key))
+        else:
+            self.coalesced += 1
+            metrics.increment('api_coalesced_total', route=key[0])
+        # A waiter timing out must not cancel the work other waiters share
+        return await asyncio.shield(future)
+
+
+async def read_request(reader, max_body=MAX_BODY_BYTES):
+    """
+    Read one HTTP/1.1 request
+
+    Returns:
+        tuple: (method, path, headers, body), or None when the client closed
+            the connection
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Incomplete request")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large")
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > max_body:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body larger than {max_body} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+def encode_response(status, body, content_type='application/json', headers=None, keep_alive=True):
+    """
+    Serialize an HTTP/1.1 response
+    """
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode('utf-8') if content_type == 'application/json' else body.encode('utf-8')
+    status = HTTPStatus(status)
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}"
+    ]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+def _fields(payload, *names):
+    """
+    Required non-empty string fields of a JSON body
+    """
+    missing = [name for name in names if not isinstance(payload.get(name), str) or not payload[name].strip()]
+    if missing:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing fields: {', '.join(missing)}")
+    return [payload[name].strip() for name in names]
+
+
+def _check_choices(learning_language, proficiency_level=None):
+    """
+    Reject languages and levels the app does not offer (they end up in
+    prompts and cache keys)
+    """
+    if learning_language not in LanguageLearningChatbot.SUPPORTED_LANGUAGES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unsupported language: {learning_language}")
+    if proficiency_level is not None and proficiency_level not in LanguageLearningChatbot.PROFICIENCY_LEVELS:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unsupported proficiency level: {proficiency_level}")
+
+
+class LanguageLearningAPI:
+    """
+    asyncio HTTP front end for LanguageLearningChatbot and DatabaseManager
+
+    Blocking SDK and database calls run on a bounded thread pool. Requests
+    beyond ``max_pending`` in progress are rejected with 503 and a
+    Retry-After header, and identical scene or analysis requests in flight
+    share one upstream call.
+
+    Routes:
+        GET  /health     Liveness
+        GET  /metrics    Prometheus metrics
+        POST /scenes     {"learning_language", "proficiency_level"}
+        POST /analyses   {"user_input", "learning_language"}
+        POST /sessions   {"user_name", "learning_language", "native_language",
+                          "proficiency_level"}
+    """
+
+    def __init__(self, chatbot, db_manager=None, workers=8, max_pending=64,
+                 request_timeout=60.0, max_body=MAX_BODY_BYTES):
+        """
+        Args:
+            chatbot (LanguageLearningChatbot): Model access
+            db_manager (DatabaseManager, optional): Needed for /sessions
+            workers (int): Threads for blocking calls
+            max_pending (int): Work requests in progress before shedding load
+            request_timeout (float): Seconds before a request answers 504
+            max_body (int): Largest request body accepted (bytes)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.chatbot = chatbot
+        self.db_manager = db_manager
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.max_body = max_body
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        self.single_flight = SingleFlight()
+        self.pending = 0
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.export_metrics,
+            ('POST', '/scenes'): self.create_scene,
+            ('POST', '/analyses'): self.create_analysis,
+            ('POST', '/sessions'): self.create_session,
+        }
+        self.route_paths = {route_path for _, route_path in self.routes}
+
+    async def _blocking(self, func, *args):
+        """
+        Run a blocking call on the worker pool
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    async def health(self, payload):
+        return HTTPStatus.OK, {'status': 'ok', 'pending': self.pending}
+
+    async def export_metrics(self, payload):
+        return HTTPStatus.OK, metrics.prometheus_text()
+
+    async def create_scene(self, payload):
+        learning_language, proficiency_level = _fields(payload, 'learning_language', 'proficiency_level')
+        _check_choices(learning_language, proficiency_level)
+        scene = await self.single_flight.do(
+            ('scene', learning_language, proficiency_level),
+            lambda: self._blocking(self.chatbot.get_scene, learning_language, proficiency_level)
+        )
+        return HTTPStatus.OK, {'scene': scene}
+
+    async def create_analysis(self, payload):
+        user_input, learning_language = _fields(payload, 'user_input', 'learning_language')
+        _check_choices(learning_language)
+        analysis, text = await self.single_flight.do(
+            ('analysis', learning_language, exact_text(user_input)),
+            lambda: self._blocking(self.chatbot.analyze_user_input_structured, user_input, learning_language)
+        )
+        if analysis is None:
+            return HTTPStatus.OK, {'structured': False, 'analysis': text}
+        return HTTPStatus.OK, {
+            'structured': True,
+            'offline': analysis.offline,
+            'approximate': analysis.approximate,
+            'corrected_sentence': analysis.corrected_sentence,
+            'mistakes': [
+                {
+                    'type': mistake.mistake_type,
+                    'original': mistake.original,
+                    'correction': mistake.correction,
+                    'explanation': mistake.explanation
+                }
+                for mistake in analysis.mistakes
+            ],
+            'tips': analysis.tips,
+            'analysis': analysis.to_markdown()
+        }
+
+    async def create_session(self, payload):
+        if self.db_manager is None or not self.db_manager.is_connected:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Database is not configured")
+        values = _fields(payload, 'user_name', 'learning_language', 'native_language', 'proficiency_level')
+        _check_choices(values[1], values[3])
+        session_id = await self._blocking(self.db_manager.create_session, *values)
+        if session_id is None:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Session could not be created")
+        return HTTPStatus.CREATED, {'session_id': session_id}
+
+    async def dispatch(self, method, path, body):
+        """
+        Route one request
+
+        Returns:
+            tuple: (status, JSON-serializable body or text)
+        """
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if path in self.route_paths:
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+        if method == 'GET':
+            return await handler({})
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+        # Shed load instead of queueing without bound
+        if self.pending >= self.max_pending:
+            metrics.increment('api_rejected_total', route=path)
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, retry shortly", {'Retry-After': '1'})
+        self.pending += 1
+        metrics.set_gauge('api_pending_requests', self.pending)
+        try:
+            return await asyncio.wait_for(handler(payload), self.request_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, "Upstream call timed out")
+        finally:
+            self.pending -= 1
+            metrics.set_gauge('api_pending_requests', self.pending)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve requests on one connection until the client closes it
+        """
+        try:
+            while True:
+                keep_alive = True
+                request = None
+                try:
+                    request = await read_request(reader, self.max_body)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    # Label with known routes only; client paths are unbounded
+                    route = path if path in self.route_paths else 'unmatched'
+                    with metrics.span('api_request', route=route):
+                        status, result = await self.dispatch(method, path, body)
+                    content_type = 'application/json' if isinstance(result, dict) else 'text/plain; version=0.0.4'
+                    writer.write(encode_response(status, result, content_type, keep_alive=keep_alive))
+                except HTTPError as e:
+                    # After a malformed request the stream position is unknown
+                    keep_alive = keep_alive and request is not None and (
+                        e.status < 500 or e.status == HTTPStatus.SERVICE_UNAVAILABLE
+                    )
+                    writer.write(encode_response(e.status, {'error': e.message}, headers=e.headers,
+                                                 keep_alive=keep_alive))
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    self.logger.error(f"Request failed: {e}")
+                    keep_alive = False
+                    writer.write(encode_response(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)},
+                                                 keep_alive=False))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """
+        Serve until cancelled
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        self.logger.info(f"Language learning API listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the language learning chatbot over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=8, help="Threads for blocking model and database calls")
+    parser.add_argument('--max-pending', type=int, default=64, help="Requests in progress before answering 503")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds before a request answers 504")
+    parser.add_argument('--api-key', default=os.getenv('GEMINI_API_KEY'), help="Gemini API key (default: GEMINI_API_KEY)")
+    parser.add_argument('--fake-llm', action='store_true', help="Answer with a local stand-in model (load tests)")
+    parser.add_argument('--fake-latency', type=float, default=0.5, help="Stand-in model time to first token (s)")
+    parser.add_argument('--fake-tokens-per-second', type=float, default=50, help="Stand-in model generation speed")
+    parser.add_argument('--fake-db', action='store_true', help="Use the in-process benchmark database")
+    parser.add_argument('--no-db', action='store_true', help="Serve without a database (/sessions answers 503)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.fake_llm:
+        chatbot = LanguageLearningChatbot(provider=StubProvider(
+            name='fake-llm',
+            latency=args.fake_latency,
+            tokens_per_second=args.fake_tokens_per_second,
+            response=canned_response
+        ))
+    else:
+        if not args.api_key:
+            parser.error("a Gemini API key is required (--api-key or GEMINI_API_KEY) unless --fake-llm is set")
+        chatbot = get_chatbot(api_key=args.api_key)
+
+    db_manager = None
+    if not args.no_db:
+        from src.database import DatabaseManager
+        db_config = {
+            'host': os.getenv('DB_HOST', 'localhost'),
+            'user': os.getenv('DB_USER', 'root'),
+            'password': os.getenv('DB_PASSWORD', ''),
+            'database': os.getenv('DB_NAME', 'language_learning_db')
+        }
+        if args.fake_db:
+            from src.benchmark import FakeDatabase
+            db_manager = DatabaseManager(pooled=False, connection_factory=FakeDatabase().connect, **db_config)
+        else:
+            db_manager = DatabaseManager(pool_size=args.workers, write_behind=True, **db_config)
+
+    api = LanguageLearningAPI(
+        chatbot,
+        db_manager=db_manager,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        request_timeout=args.timeout
+    )
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
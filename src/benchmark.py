@@ -0,0 +1,416 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.analysis_memo import AnalysisMemo, get_analysis_memo
+from src.chatbot import LanguageLearningChatbot, get_chatbot
+from src.database import SESSION_COLUMNS, DatabaseManager
+from src.metrics import metrics
+from src.migrations import MIGRATIONS
+from src.providers import StubProvider, canned_response
+from src.scene_cache import SceneCache
+from src.scheduler import RequestScheduler
+
+# A p95 this much slower than the baseline counts as a regression
+REGRESSION_THRESHOLD = 0.10
+
+LEVELS = ['Beginner', 'Intermediate', 'Advanced']
+
+
+class FakeDatabase:
+    """
+    In-process stand-in for MySQL covering the statements DatabaseManager
+    issues, with optional per-statement latency
+
+    The schema is reported as fully migrated; session rows live in memory.
+    """
+
+    def __init__(self, latency=0.0):
+        """
+        Args:
+            latency (float): Seconds added to every statement
+        """
+        self.latency = latency
+        self.sessions = []
+        self.session_keys = {}
+        self.next_session_id = 1
+        self.statements = 0
+        self._lock = threading.Lock()
+
+    def connect(self, **config):
+        """
+        ``mysql.connector.connect`` replacement
+        """
+        return FakeConnection(self)
+
+    def execute(self, query, params):
+        """
+        Run one statement
+
+        Returns:
+            tuple: (rows, lastrowid, rowcount)
+        """
+        time.sleep(self.latency)
+        normalized = ' '.join(query.split()).upper()
+        params = tuple(params or ())
+        with self._lock:
+            self.statements += 1
+            if 'GET_LOCK' in normalized or 'RELEASE_LOCK' in normalized:
+                return [(1,)], None, 1
+            if 'FROM SCHEMA_MIGRATIONS' in normalized:
+                return [(MIGRATIONS[-1][0],)], None, 1
+            if 'SESSION_ID_SEQUENCE' in normalized:
+                if normalized.startswith('SELECT'):
+                    return [(self.next_session_id,)], None, 1
+                if normalized.startswith('UPDATE'):
+                    self.next_session_id = params[0]
+                return [], None, 1
+            if 'MAX(ID)' in normalized:
+                return [(max((row[0] for row in self.sessions), default=0) + 1,)], None, 1
+            if normalized.startswith('INSERT INTO USER_SESSIONS'):
+                explicit_id = normalized.startswith('INSERT INTO USER_SESSIONS (ID,')
+                session_id = params[0] if explicit_id else len(self.sessions) + 1
+                values = params[1:] if explicit_id else params
+                idempotency_key = values[4] if len(values) > 4 else None
+                if idempotency_key is not None and idempotency_key in self.session_keys:
+                    # Unique key hit: ON DUPLICATE KEY UPDATE
+                    return [], self.session_keys[idempotency_key], 2
+                if idempotency_key is not None:
+                    self.session_keys[idempotency_key] = session_id
+                self.sessions.append((session_id,) + tuple(values[:4]) + (datetime.now(), 0))
+                return [], session_id, 1
+            if normalized.startswith('SELECT') and 'FROM USER_SESSIONS' in normalized:
+                rows = sorted(self.sessions, key=lambda row: (row[5], row[0]), reverse=True)
+                if 'LIMIT' in normalized and params:
+                    rows = rows[:params[-1]]
+                return rows, None, len(rows)
+            return [], None, 0
+
+
+class FakeCursor:
+    def __init__(self, database, dictionary=False):
+        self.database = database
+        self.dictionary = dictionary
+        self.column_names = tuple(SESSION_COLUMNS)
+        self.lastrowid = None
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, query, params=None):
+        rows, lastrowid, rowcount = self.database.execute(query, params)
+        if self.dictionary:
+            rows = [dict(zip(SESSION_COLUMNS, row)) if len(row) == len(SESSION_COLUMNS) else {'value': row[0]} for row in rows]
+        self._rows = list(rows)
+        self.lastrowid = lastrowid
+        self.rowcount = rowcount
+
+    def executemany(self, query, seq_params):
+        for params in seq_params:
+            self.execute(query, params)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self, dictionary=False, buffered=None):
+        return FakeCursor(self.database, dictionary=dictionary)
+
+    def commit(self):
+        pass
+
+    def consume_results(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def _percentile(samples, percent):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class BenchmarkRunner:
+    """
+    Drives the real chatbot and database code paths with fakes behind them
+    """
+
+    def __init__(self, users=8, iterations=25, llm_latency=0.2, tokens_per_second=200,
+                 quota_error_rate=0.0, db_latency=0.002, seed=7):
+        """
+        Args:
+            users (int): Simulated concurrent users
+            iterations (int): Operations per user per scenario
+            llm_latency (float): Seconds before the fake LLM starts answering
+            tokens_per_second (float): Fake LLM generation speed
+            quota_error_rate (float): Share of fake LLM calls failing with 429
+            db_latency (float): Seconds per fake database statement
+            seed (int): Seed for repeatable error injection
+        """
+        self.users = users
+        self.iterations = iterations
+        self.provider = StubProvider(
+            latency=llm_latency,
+            tokens_per_second=tokens_per_second,
+            response=canned_response,
+            quota_error_rate=quota_error_rate,
+            seed=seed
+        )
+        self.database = FakeDatabase(latency=db_latency)
+        self._cache_dir = tempfile.mkdtemp(prefix='llb-bench-')
+        self.db_config = {
+            'host': 'fake',
+            'user': 'bench',
+            'password': '',
+            'database': 'bench',
+            'connection_factory': self.database.connect
+        }
+
+    def _chatbot(self, cached):
+        scene_cache = SceneCache(
+            os.path.join(self._cache_dir, f"scenes-{time.monotonic_ns()}.db"),
+            variants=3 if cached else 10 ** 9
+        )
+        return LanguageLearningChatbot(
+            provider=self.provider,
+            scene_cache=scene_cache,
+            scheduler=RequestScheduler(default_rate=10 ** 6, base_delay=0.05, deadline=30),
+            analysis_memo=AnalysisMemo() if cached else AnalysisMemo(max_entries=0)
+        )
+
+    def _warm(self, chatbot):
+        """
+        Fill a chatbot's scene cache for every language and level, as the
+        prefill job does, so cached scenarios measure hits only
+        """
+        def fill(combination):
+            scene, cache_key = chatbot.generate_scene_entry(*combination)
+            for _ in range(chatbot.scene_cache.variants_per_key):
+                chatbot.scene_cache.put(cache_key, scene)
+
+        combinations = [
+            (language, level) for language in LanguageLearningChatbot.SUPPORTED_LANGUAGES for level in LEVELS
+        ]
+        with ThreadPoolExecutor(max_workers=self.users) as executor:
+            list(executor.map(fill, combinations))
+
+    def _measure(self, name, operation):
+        """
+        Run ``operation(user, iteration)`` for every simulated user
+
+        Returns:
+            dict: Throughput, latency percentiles and peak memory
+        """
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def run_user(user):
+            nonlocal errors
+            for iteration in range(self.iterations):
+                started = time.perf_counter()
+                try:
+                    operation(user, iteration)
+                except Exception:
+                    with lock:
+                        errors += 1
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.users) as executor:
+            list(executor.map(run_user, range(self.users)))
+        elapsed = time.perf_counter() - started
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'scenario': name,
+            'operations': len(latencies),
+            'errors': errors,
+            'throughput_per_second': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 3) if latencies else None,
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+            'peak_memory_kb': round(peak_memory / 1024, 1)
+        }
+
+    def run(self):
+        """
+        Run every scenario
+
+        The app's process-wide objects (the default scene cache and the
+        database log) write to the working directory, so the run happens
+        inside the benchmark's temporary directory.
+
+        Returns:
+            list: One result dict per scenario
+        """
+        previous_dir = os.getcwd()
+        os.chdir(self._cache_dir)
+        try:
+            return self._run_scenarios()
+        finally:
+            os.chdir(previous_dir)
+
+    def _run_scenarios(self):
+        languages = LanguageLearningChatbot.SUPPORTED_LANGUAGES
+        cold_chatbot = self._chatbot(cached=False)
+        warm_chatbot = self._chatbot(cached=True)
+        self._warm(warm_chatbot)
+        db_manager = DatabaseManager(pooled=False, **self.db_config)
+
+        def rerun_setup(user, iteration):
+            # The shared objects a default app.main rerun fetches, in the same
+            # order; app.main itself and any rendering are not run
+            with metrics.trace('rerun'):
+                chatbot = get_chatbot(api_key=f"benchmark-key-{user}")
+                DatabaseManager(pooled=False, **self.db_config)
+                get_analysis_memo().stats()
+                chatbot.breaker.snapshot()
+                metrics.recent_traces()
+            metrics.prometheus_text()
+
+        def create_session(user, iteration):
+            db_manager.create_session(f"user{user}-{iteration}", languages[iteration % len(languages)], 'English', 'Beginner')
+
+        def resubmit_session(user, iteration):
+            # The same form submitted again within the idempotency window
+            db_manager.create_session(f"user{user}", 'Spanish', 'English', 'Beginner')
+
+        def scene(chatbot):
+            def generate(user, iteration):
+                chatbot.generate_conversation_scene(
+                    languages[(user + iteration) % len(languages)],
+                    LEVELS[iteration % len(LEVELS)]
+                )
+            return generate
+
+        def analyze(user, iteration):
+            cold_chatbot.analyze_user_input(f"Yo soy estudiante numero {user}-{iteration}", 'Spanish')
+
+        def start_learning(user, iteration):
+            # The "Start Learning" path: insert the session, then stream the scene
+            language = languages[(user + iteration) % len(languages)]
+            db_manager.create_session(f"learner{user}-{iteration}", language, 'English', 'Beginner')
+            ''.join(warm_chatbot.stream_conversation_scene(language, 'Beginner'))
+
+        return [
+            self._measure('rerun_setup', rerun_setup),
+            self._measure('create_session', create_session),
+            self._measure('session_resubmit', resubmit_session),
+            self._measure('scene_uncached', scene(cold_chatbot)),
+            self._measure('scene_cached', scene(warm_chatbot)),
+            self._measure('analyze_input', analyze),
+            self._measure('start_learning', start_learning),
+        ]
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare results with a saved baseline
+
+    Returns:
+        list: Descriptions of scenarios whose p95 regressed
+    """
+    previous = {result['scenario']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result['scenario'])
+        if not before or not before.get('p95_ms') or result['p95_ms'] is None:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms']
+        if change > threshold:
+            regressions.append(
+                f"{result['scenario']}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms (+{change:.0%})"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chatbot and database paths with fake backends")
+    parser.add_argument('--users', type=int, default=8, help="Concurrent simulated users")
+    parser.add_argument('--iterations', type=int, default=25, help="Operations per user per scenario")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Fake LLM time to first token (s)")
+    parser.add_argument('--tokens-per-second', type=float, default=200, help="Fake LLM generation speed")
+    parser.add_argument('--quota-error-rate', type=float, default=0.0, help="Share of fake LLM calls returning 429")
+    parser.add_argument('--db-latency', type=float, default=0.002, help="Fake database time per statement (s)")
+    parser.add_argument('--save-baseline', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against this JSON file; exit 1 on regressions")
+    args = parser.parse_args(argv)
+
+    runner = BenchmarkRunner(
+        users=args.users,
+        iterations=args.iterations,
+        llm_latency=args.llm_latency,
+        tokens_per_second=args.tokens_per_second,
+        quota_error_rate=args.quota_error_rate,
+        db_latency=args.db_latency
+    )
+    results = runner.run()
+
+    print(f"\n{'scenario':<16}{'ops':>6}{'err':>5}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KB':>10}")
+    for result in results:
+        print(
+            f"{result['scenario']:<16}{result['operations']:>6}{result['errors']:>5}"
+            f"{result['throughput_per_second']:>10}{str(result['p50_ms']):>10}"
+            f"{str(result['p95_ms']):>10}{str(result['p99_ms']):>10}{result['peak_memory_kb']:>10}"
+        )
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'machine': platform.node(),
+        'python': platform.python_version(),
+        'settings': vars(args),
+        'results': results
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file))
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   🔹 {regression}")
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
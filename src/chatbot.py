@@ -1,37 +1,183 @@
 import os
-import streamlit as st
-import google.generativeai as genai
+import hashlib
+import random
+import threading
+import time
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.lazy import lazy_import
+from src.analysis_memo import get_analysis_memo
+from src.circuit_breaker import OPEN, CircuitBreaker
+from src.fallback import OFFLINE_NOTE, check_sentence, prebuilt_scene
+from src.scene_cache import get_scene_cache
+from src.scheduler import RequestScheduler
+from src.providers import GeminiProvider, HedgedProvider
+from src.metrics import metrics
+from src.mistakes import (
+    ANALYSIS_GENERATION_CONFIG, BATCH_ANALYSIS_SCHEMA, MISTAKE_TYPES, AnalysisStreamRenderer, InputAnalysis,
+    parse_analysis, parse_batch_analysis
+)
+
+# Heavy dependencies, imported on first use
+st = lazy_import('streamlit')
+
+# Model fallback order, most capable first
+MODEL_NAMES = [
+    'gemini-1.5-pro-latest',
+    'gemini-1.5-flash-latest',
+    'gemini-pro'
+]
+
+# Client-side request budget per model (requests per minute)
+MODEL_RATE_LIMITS = {
+    'gemini-1.5-pro-latest': 60,
+    'gemini-1.5-flash-latest': 60,
+    'gemini-pro': 60
+}
+
+# How long a successful/failed connection test stays valid (seconds)
+HEALTH_CHECK_TTL = 300
+
+# Generation settings for conversation scenes (part of the scene cache key)
+SCENE_GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'max_output_tokens': 600
+}
+
+# Packing limits for batched input analysis
+BATCH_PROMPT_TOKEN_BUDGET = 1500
+BATCH_MAX_ITEMS_PER_PROMPT = 8
+BATCH_OUTPUT_TOKENS_PER_ITEM = 400
+BATCH_MAX_CONCURRENCY = 4
+
+# Process-wide chatbots, keyed by a hash of the API key; the least
+# recently used ones are dropped (e.g. after mistyped or rotated keys)
+MAX_CHATBOTS = 8
+_chatbots = OrderedDict()
+_chatbots_lock = threading.Lock()
+
+
+def _resolve_api_key(api_key=None):
+    """
+    Resolve the Gemini API key without prompting the user
+
+    Priority:
+    1. Passed parameter
+    2. Streamlit secrets
+    3. Environment variable
+    """
+    if not api_key:
+        # Check Streamlit secrets (raises when no secrets file exists)
+        try:
+            api_key = st.secrets.get("GEMINI_API_KEY") if hasattr(st.secrets, 'GEMINI_API_KEY') else None
+        except Exception:
+            api_key = None
+
+    if not api_key:
+        # Check environment variables
+        api_key = os.getenv('GEMINI_API_KEY')
+
+    return api_key
+
+
+def estimate_tokens(text):
+    """
+    Rough token count for prompt packing (about four characters per token)
+    """
+    return len(text) // 4 + 1
+
+
+def get_chatbot(api_key=None):
+    """
+    Return the process-wide chatbot for an API key, creating it on first use
+
+    Streamlit reruns the whole script on every widget interaction, so the
+    chatbot (and its model selection) is shared across reruns and sessions
+    instead of being rebuilt each time.
+
+    Args:
+        api_key (str, optional): API key for Gemini
+
+    Returns:
+        LanguageLearningChatbot: Shared chatbot instance
+    """
+    resolved_key = _resolve_api_key(api_key)
+    if not resolved_key:
+        # Nothing to cache; let the chatbot prompt for a key
+        return LanguageLearningChatbot(api_key=api_key)
+
+    key_hash = hashlib.sha256(resolved_key.encode('utf-8')).hexdigest()
+    with metrics.span('chatbot_init'), _chatbots_lock:
+        chatbot = _chatbots.get(key_hash)
+        if chatbot is None:
+            chatbot = LanguageLearningChatbot(api_key=resolved_key)
+            _chatbots[key_hash] = chatbot
+            while len(_chatbots) > MAX_CHATBOTS:
+                _chatbots.popitem(last=False)
+        else:
+            _chatbots.move_to_end(key_hash)
+        return chatbot
+
 
 class LanguageLearningChatbot:
     SUPPORTED_LANGUAGES = [
         'Spanish', 'French', 'German', 
         'Italian', 'Portuguese', 'Chinese'
     ]
+    PROFICIENCY_LEVELS = ['Beginner', 'Intermediate', 'Advanced']
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, health_check_ttl=HEALTH_CHECK_TTL, scene_cache=None,
+                 scheduler=None, provider=None, hedge_provider=None, analysis_memo=None, breaker=None):
         """
         Initialize chatbot with flexible API key management
         
+        No network calls are made here: the model is created lazily and only
+        probed when a connection test is explicitly requested.
+
         Args:
             api_key (str, optional): API key for Gemini
+            health_check_ttl (int): Seconds a connection test result is reused
+            scene_cache (SceneCache, optional): Cache for generated scenes;
+                defaults to the shared on-disk cache
+            scheduler (RequestScheduler, optional): Rate limiter and retry
+                policy for model calls
+            provider (LLMProvider, optional): Backend to use instead of the
+                Gemini fallback list (e.g. Groq or a local stub)
+            hedge_provider (LLMProvider, optional): Secondary backend raced
+                against Gemini calls slower than their p95 latency
+            analysis_memo (AnalysisMemo, optional): Memo of input analyses;
+                defaults to the shared in-memory memo
+            breaker (CircuitBreaker, optional): Circuit breaker around model
+                calls; while it is open, scenes and analyses come from the
+                local fallback
         """
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
-        # Priority for API key retrieval
-        # 1. Passed parameter
-        # 2. Streamlit secrets
-        # 3. Environment variable
-        # 4. User input
-        if not api_key:
-            # Check Streamlit secrets
-            api_key = st.secrets.get("GEMINI_API_KEY") if hasattr(st.secrets, 'GEMINI_API_KEY') else None
+        self.model_names = list(MODEL_NAMES)
+        self.health_check_ttl = health_check_ttl
+        self._models = {}
+        self._model_index = 0
+        self._health = None
+        self._health_checked_at = 0.0
+        self._lock = threading.Lock()
+        self.scene_cache = scene_cache if scene_cache is not None else get_scene_cache()
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler(MODEL_RATE_LIMITS)
+        self.provider = provider
+        self.hedge_provider = hedge_provider
+        self.analysis_memo = analysis_memo if analysis_memo is not None else get_analysis_memo()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+
+        if provider is not None:
+            # Injected backend: no Gemini key or fallback list involved
+            self.model_names = [provider.name]
+            self._models[provider.name] = provider
+            self.api_key = None
+            return
         
-        if not api_key:
-            # Check environment variables
-            api_key = os.getenv('GEMINI_API_KEY')
+        api_key = _resolve_api_key(api_key)
         
         if not api_key:
             # Prompt user for API key with warning
@@ -44,55 +190,183 @@ class LanguageLearningChatbot:
         # Debug and safety checks
         if not api_key:
             st.warning("No API key provided. Some functionalities will be limited.")
-            self.model = None
+            self.api_key = None
             return
 
-        try:
-            # Configure generative AI
-            genai.configure(api_key=api_key)
-            
-            # Model initialization with fallback mechanism
-            model_names = [
-                'gemini-1.5-pro-latest', 
-                'gemini-1.5-flash-latest', 
-                'gemini-pro'
-            ]
-            
-            self.model = None
-            for model_name in model_names:
+        # The Gemini SDK is imported with the first model, which gets a client for this key
+        self.api_key = api_key
+
+    @property
+    def model(self):
+        """
+        Current model provider, created on first access (no network call)
+        """
+        return self._get_model(self.model_name)
+
+    @property
+    def model_name(self):
+        """
+        Name of the model currently selected from the fallback list
+        """
+        return self.model_names[self._model_index]
+
+    def _get_model(self, model_name):
+        """
+        Provider for a model name, created once per chatbot
+        """
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None and self.api_key:
                 try:
-                    self.model = genai.GenerativeModel(model_name)
-                    # Test model with a simple prompt
-                    self.model.generate_content("Test connection")
-                    st.success(f"Successfully initialized with model: {model_name}")
-                    break
+                    model = GeminiProvider(model_name, api_key=self.api_key)
+                    if self.hedge_provider is not None:
+                        model = HedgedProvider(model, self.hedge_provider)
+                    self._models[model_name] = model
                 except Exception as model_error:
                     self.logger.warning(f"Model {model_name} initialization failed: {model_error}")
-            
-            if not self.model:
-                st.error("Could not initialize any Gemini model. Please check your API key.")
-        
-        except Exception as e:
-            self.logger.error(f"Comprehensive Error initializing AI: {e}")
-            st.error(f"Initialization Error: {e}")
-            self.model = None
+            return model
 
-    def generate_conversation_scene(self, learning_language, proficiency_level):
+    def _fallback_order(self):
         """
-        Generate a contextual conversation scene with robust error handling
-        
+        Model names starting with the current one, in fallback order
+        """
+        index = self._model_index
+        return self.model_names[index:] + self.model_names[:index]
+
+    def _select_model(self, model_name):
+        """
+        Make the model that answered the preferred one for later calls
+        """
+        index = self.model_names.index(model_name)
+        if index != self._model_index:
+            self._model_index = index
+            self.logger.warning(f"Falling back to model: {model_name}")
+
+    def _generate(self, prompt, **kwargs):
+        """
+        Call the current model through the request scheduler (see
+        ``_generate_with_model``)
+
+        Returns:
+            Response with ``text`` (or an iterator of chunks when streaming)
+        """
+        return self._generate_with_model(prompt, **kwargs)[1]
+
+    def generate(self, prompt, generation_config=None):
+        """
+        Generate text for a prompt with the chatbot's models, scheduler and
+        circuit breaker (for other modules building their own prompts)
+
+        Returns:
+            str: Response text
+
+        Raises:
+            Exception: Model errors, including CircuitOpenError
+        """
+        return self._generate(prompt, generation_config=generation_config).text
+
+    def _generate_with_model(self, prompt, **kwargs):
+        """
+        Call the current model through the request scheduler
+
+        The scheduler waits for rate-limit tokens, honors server retry delays
+        and walks the fallback list only when a call fails. While the circuit
+        breaker is open, no call is made at all.
+
         Args:
-            learning_language (str): Target language for learning
-            proficiency_level (str): User's current language proficiency level
-        
+            prompt (str): Prompt to send
+            **kwargs: ``generation_config`` and ``stream`` for the provider
+
         Returns:
-            str: Generated conversation scene or error message
+            tuple: (name of the model that answered, response with ``text``
+                or an iterator of chunks when streaming)
+
+        Raises:
+            CircuitOpenError: The circuit is open
         """
-        if not self.model:
-            st.warning("AI model not initialized. Please check your API key.")
-            return "AI model not initialized. Please verify your Gemini API key."
-        
-        prompt = f"""
+        def call(model_name):
+            model = self._get_model(model_name)
+            if model is None:
+                raise RuntimeError(f"Model {model_name} is not available")
+            with metrics.span('llm_call', model=model_name):
+                response = model.generate(prompt, **kwargs)
+            self._record_tokens(model_name, response)
+            return response
+
+        self.breaker.check()
+        try:
+            model_name, response = self.scheduler.run(call, self._fallback_order())
+        except Exception:
+            self.breaker.record_failure()
+            self._record_health(False)
+            raise
+
+        self.breaker.record_success()
+        self._select_model(model_name)
+        self._record_health(True)
+        return model_name, response
+
+    def _record_tokens(self, model_name, response):
+        """
+        Count prompt/completion tokens reported by the provider, if any
+        """
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            prompt_tokens = getattr(usage, 'prompt_token_count', None)
+            completion_tokens = getattr(usage, 'candidates_token_count', None)
+        else:
+            usage = getattr(response, 'usage', None) or {}
+            prompt_tokens = usage.get('prompt_tokens') if isinstance(usage, dict) else None
+            completion_tokens = usage.get('completion_tokens') if isinstance(usage, dict) else None
+
+        if prompt_tokens:
+            metrics.increment('llm_tokens_total', prompt_tokens, model=model_name, kind='prompt')
+        if completion_tokens:
+            metrics.increment('llm_tokens_total', completion_tokens, model=model_name, kind='completion')
+
+    def _record_health(self, healthy):
+        """
+        Cache the outcome of a model call as the current health status
+        """
+        self._health = healthy
+        self._health_checked_at = time.monotonic()
+
+    def check_connection(self, force=False):
+        """
+        Test the model connection, reusing a recent result within the TTL
+
+        Any real model call also refreshes the cached result, so this only
+        reaches the network when nothing has been sent for a while. While
+        the circuit breaker is open the model counts as unavailable.
+
+        Args:
+            force (bool): Ignore the cached result and probe again
+
+        Returns:
+            bool: True if the model answered
+        """
+        if self.model is None or self.breaker.state == OPEN:
+            return False
+
+        fresh = time.monotonic() - self._health_checked_at < self.health_check_ttl
+        if self._health is not None and fresh and not force:
+            return self._health
+
+        try:
+            self._generate(
+                "Test connection",
+                generation_config={'max_output_tokens': 1}
+            )
+            self.logger.info(f"Successfully connected with model: {self.model_name}")
+        except Exception as e:
+            self.logger.error(f"Connection test failed: {e}")
+        return bool(self._health)
+
+    def _scene_prompt(self, learning_language, proficiency_level):
+        """
+        Build the conversation scene prompt (deterministic per language and level)
+        """
+        return f"""
         Create a realistic conversation scenario in {learning_language} 
         for a {proficiency_level} language learner. 
         Provide:
@@ -113,16 +387,139 @@ class LanguageLearningChatbot:
         Key Vocabulary:
         - [Word/Phrase]: [Meaning]
         """
+
+    def scene_cache_key(self, learning_language, proficiency_level, model_name=None):
+        """
+        Scene cache key for a language and level with a model (default: the
+        current one)
+        """
+        prompt = self._scene_prompt(learning_language, proficiency_level)
+        return self.scene_cache.make_key(prompt, model_name or self.model_name, SCENE_GENERATION_CONFIG)
+
+    def scene_cache_keys(self, learning_language, proficiency_level):
+        """
+        Scene cache keys for a language and level with every model, in
+        fallback order starting with the current one
+
+        Scenes are stored under the model that generated them, so lookups
+        check the whole chain: a scene made during a fallback stays
+        reachable after the selection moves on.
+        """
+        return [
+            self.scene_cache_key(learning_language, proficiency_level, model_name)
+            for model_name in self._fallback_order()
+        ]
+
+    def cached_scene(self, learning_language, proficiency_level):
+        """
+        Cached scene for a language and level from any model, counting hits
+        and misses
+
+        Returns:
+            str or None: A variant from the first key with a full set
+        """
+        with metrics.span('scene_cache_lookup'):
+            for cache_key in self.scene_cache_keys(learning_language, proficiency_level):
+                scene = self.scene_cache.get(cache_key)
+                if scene:
+                    break
+        metrics.increment('cache_requests_total', cache='scene', result='hit' if scene else 'miss')
+        return scene
+
+    def _fallback_scene(self, learning_language, proficiency_level):
+        """
+        Scene served while the model is unavailable: any cached variant for
+        the language and level, else a built-in one
+        """
+        metrics.increment('llm_degraded_responses_total', kind='scene')
+        for cache_key in self.scene_cache_keys(learning_language, proficiency_level):
+            cached_scenes = self.scene_cache.variants(cache_key)
+            if cached_scenes:
+                return random.choice(cached_scenes)
+        return prebuilt_scene(learning_language, proficiency_level)
+
+    def _fallback_analysis(self, user_input, learning_language):
+        """
+        Rule-based analysis served while the model is unavailable
+        """
+        metrics.increment('llm_degraded_responses_total', kind='analysis')
+        return check_sentence(user_input, learning_language), OFFLINE_NOTE
+
+    def generate_new_scene(self, learning_language, proficiency_level):
+        """
+        Generate a fresh scene without consulting or filling the cache
+
+        Used by batch jobs; errors are raised instead of shown in the page.
+
+        Returns:
+            str: Generated scene text
+        """
+        return self.generate_scene_entry(learning_language, proficiency_level)[0]
+
+    def generate_scene_entry(self, learning_language, proficiency_level):
+        """
+        Generate a fresh scene along with the cache key of the model that
+        produced it (which differs from the current one after a fallback)
+
+        Returns:
+            tuple: (scene text, cache key)
+        """
+        model_name, response = self._generate_with_model(
+            self._scene_prompt(learning_language, proficiency_level),
+            generation_config=SCENE_GENERATION_CONFIG
+        )
+        if not response or not response.text:
+            raise ValueError("Empty scene returned by the model")
+        return response.text, self.scene_cache_key(learning_language, proficiency_level, model_name)
+
+    def get_scene(self, learning_language, proficiency_level):
+        """
+        Cached scene, generated and cached on a miss
+
+        Used by the HTTP API; nothing is shown in the page. When the model
+        is unavailable a fallback scene is returned (and not cached).
+
+        Returns:
+            str: Scene text
+        """
+        cached_scene = self.cached_scene(learning_language, proficiency_level)
+        if cached_scene:
+            return cached_scene
+
+        try:
+            scene, cache_key = self.generate_scene_entry(learning_language, proficiency_level)
+        except Exception as e:
+            self.logger.warning(f"Serving a fallback scene: {e}")
+            return self._fallback_scene(learning_language, proficiency_level)
+        self.scene_cache.put(cache_key, scene)
+        return scene
+
+    def generate_conversation_scene(self, learning_language, proficiency_level):
+        """
+        Generate a contextual conversation scene with robust error handling
+        
+        Args:
+            learning_language (str): Target language for learning
+            proficiency_level (str): User's current language proficiency level
+        
+        Returns:
+            str: Generated conversation scene, or a fallback scene while the
+                model is unavailable
+        """
+        if not self.model:
+            st.info(OFFLINE_NOTE)
+            return self._fallback_scene(learning_language, proficiency_level)
+        
+        prompt = self._scene_prompt(learning_language, proficiency_level)
+
+        cached_scene = self.cached_scene(learning_language, proficiency_level)
+        if cached_scene:
+            return cached_scene
         
         try:
-            generation_config = {
-                'temperature': 0.7,
-                'max_output_tokens': 600
-            }
-            
-            response = self.model.generate_content(
+            model_name, response = self._generate_with_model(
                 prompt, 
-                generation_config=generation_config
+                generation_config=SCENE_GENERATION_CONFIG
             )
             
             # Enhanced error checking
@@ -130,13 +527,87 @@ class LanguageLearningChatbot:
                 st.warning("Unable to generate conversation. Please try again.")
                 return "Unable to generate conversation. Please retry."
             
+            self.scene_cache.put(
+                self.scene_cache_key(learning_language, proficiency_level, model_name), response.text
+            )
             return response.text
         
         except Exception as e:
-            error_message = f"Error generating conversation: {str(e)}"
-            self.logger.error(error_message)
-            st.error(error_message)
-            return error_message
+            self.logger.error(f"Error generating conversation: {str(e)}")
+            st.info(OFFLINE_NOTE)
+            return self._fallback_scene(learning_language, proficiency_level)
+
+    def _structured_analysis_prompt(self, user_input, learning_language):
+        """
+        Build the input analysis prompt asking for schema-constrained JSON
+        """
+        return f"""
+        Language Learning Analysis for {learning_language}:
+        Input Sentence: {user_input}
+        
+        List every mistake in the sentence and respond with JSON only:
+        {{"corrected_sentence": "<corrected sentence>",
+          "mistakes": [{{"type": "<one of: {', '.join(MISTAKE_TYPES)}>",
+                        "original": "<wrong fragment>",
+                        "correction": "<corrected fragment>",
+                        "explanation": "<short explanation>"}}],
+          "tips": ["<short learning tip>"]}}
+        """
+
+    def _memoized_analysis(self, user_input, learning_language):
+        """
+        Memoized (analysis, text) for a sentence, or None
+
+        Answers for a near-duplicate sentence are marked ``approximate``.
+        """
+        with metrics.span('analysis_memo_lookup'):
+            memoized, memo_result = self.analysis_memo.lookup(learning_language, user_input)
+        if memo_result == 'near_hit':
+            analysis, text = memoized
+            return InputAnalysis(analysis.corrected_sentence, analysis.mistakes, analysis.tips, approximate=True), text
+        return memoized
+
+    def analyze_user_input_structured(self, user_input, learning_language):
+        """
+        Analyze user input into typed mistake records
+        
+        Repeated sentences (identical up to Unicode form and whitespace) and,
+        when enabled, near-duplicates in the same language are answered from
+        the analysis memo without a model call; near-duplicate answers are
+        marked ``approximate``. While the model is unavailable, the rule-based
+        checker answers instead and its result is not memoized.
+        
+        Args:
+            user_input (str): User's input in the learning language
+            learning_language (str): Target language being learned
+        
+        Returns:
+            tuple: (InputAnalysis or None, raw response text); the analysis
+                is None when the model did not return valid JSON and marked
+                ``offline`` when it comes from the rule-based checker
+        """
+        memoized = self._memoized_analysis(user_input, learning_language)
+        if memoized is not None:
+            return memoized
+
+        if not self.model:
+            return self._fallback_analysis(user_input, learning_language)
+
+        try:
+            response = self._generate(
+                self._structured_analysis_prompt(user_input, learning_language),
+                generation_config=ANALYSIS_GENERATION_CONFIG
+            )
+        except Exception as e:
+            self.logger.warning(f"Serving a rule-based analysis: {e}")
+            return self._fallback_analysis(user_input, learning_language)
+        try:
+            result = parse_analysis(response.text), response.text
+            self.analysis_memo.put(learning_language, user_input, result)
+            return result
+        except ValueError as e:
+            self.logger.warning(f"Unstructured analysis returned: {e}")
+            return None, response.text
 
     def analyze_user_input(self, user_input, learning_language):
         """
@@ -149,27 +620,309 @@ class LanguageLearningChatbot:
         Returns:
             str: Detailed language learning analysis
         """
+        analysis, text = self.analyze_user_input_structured(user_input, learning_language)
+        if analysis is not None and analysis.offline:
+            st.info(OFFLINE_NOTE)
+        return analysis.to_markdown() if analysis else text
+
+    def generate_stream(self, prompt, **kwargs):
+        """
+        Stream text chunks from the model as they arrive
+
+        Model fallback applies to starting the stream; errors while it is
+        being consumed are raised to the caller.
+
+        Args:
+            prompt (str): Prompt to send
+            **kwargs: ``generation_config`` for the provider
+
+        Yields:
+            str: Response text chunks
+        """
+        yield from self._stream_text(self._generate(prompt, stream=True, **kwargs))
+
+    @staticmethod
+    def _stream_text(response):
+        """
+        Text of the chunks of a streamed response, skipping empty ones
+        """
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. a safety-blocked candidate)
+                continue
+            if text:
+                yield text
+
+    def stream_conversation_scene(self, learning_language, proficiency_level):
+        """
+        Streaming variant of ``generate_conversation_scene``
+
+        Cached scenes are yielded in one piece; new scenes are yielded chunk
+        by chunk and cached once complete. Fallback scenes and error messages
+        are yielded too but reported as incomplete, so callers do not keep them.
+
+        Args:
+            learning_language (str): Target language for learning
+            proficiency_level (str): User's current language proficiency level
+
+        Yields:
+            str: Scene text chunks
+
+        Returns:
+            tuple: (text, complete) as the generator's return value; ``complete``
+                is True only for a cached or fully generated scene
+        """
         if not self.model:
-            st.warning("AI model not initialized. Please check your API key.")
-            return "AI model not initialized. Please verify your Gemini API key."
-        
-        prompt = f"""
-        Comprehensive Language Learning Analysis for {learning_language}:
-        Input Sentence: {user_input}
-        
-        Provide a detailed analysis:
-        1. Grammatical Corrections
-        2. Detailed Error Explanations
-        3. Suggested Improvements
-        4. Corrected Sentence Version
-        5. Language Learning Tips
+            st.info(OFFLINE_NOTE)
+            scene = self._fallback_scene(learning_language, proficiency_level)
+            yield scene
+            return scene, False
+
+        prompt = self._scene_prompt(learning_language, proficiency_level)
+
+        cached_scene = self.cached_scene(learning_language, proficiency_level)
+        if cached_scene:
+            yield cached_scene
+            return cached_scene, True
+
+        chunks = []
+        try:
+            model_name, response = self._generate_with_model(
+                prompt, stream=True, generation_config=SCENE_GENERATION_CONFIG
+            )
+            for text in self._stream_text(response):
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            error_message = f"Error generating conversation: {str(e)}"
+            self.logger.error(error_message)
+            if chunks:
+                # Part of the scene is already on the page
+                st.error(error_message)
+                yield error_message
+                return ''.join(chunks), False
+            st.info(OFFLINE_NOTE)
+            scene = self._fallback_scene(learning_language, proficiency_level)
+            yield scene
+            return scene, False
+
+        scene = ''.join(chunks)
+        if not scene:
+            st.warning("Unable to generate conversation. Please try again.")
+            message = "Unable to generate conversation. Please retry."
+            yield message
+            return message, False
+
+        self.scene_cache.put(self.scene_cache_key(learning_language, proficiency_level, model_name), scene)
+        return scene, True
+
+    def stream_user_input_analysis(self, user_input, learning_language):
         """
-        
+        Streaming variant of ``analyze_user_input_structured``
+
+        The structured analysis is rendered as markdown while it arrives:
+        the corrected sentence first, then each mistake once complete.
+        Memoized answers and rule-based fallbacks are yielded in one piece.
+
+        Args:
+            user_input (str): User's input in the learning language
+            learning_language (str): Target language being learned
+
+        Yields:
+            str: Markdown chunks
+
+        Returns:
+            tuple: (InputAnalysis or None, raw response text), as
+                ``analyze_user_input_structured`` (as the generator's return value)
+        """
+        memoized = self._memoized_analysis(user_input, learning_language)
+        if memoized is not None:
+            yield memoized[0].to_markdown()
+            return memoized
+
+        if not self.model:
+            st.info(OFFLINE_NOTE)
+            result = self._fallback_analysis(user_input, learning_language)
+            yield result[0].to_markdown()
+            return result
+
+        prompt = self._structured_analysis_prompt(user_input, learning_language)
+        renderer = AnalysisStreamRenderer()
+
+        chunks = []
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            for text in self.generate_stream(prompt, generation_config=ANALYSIS_GENERATION_CONFIG):
+                chunks.append(text)
+                markdown = renderer.feed(text)
+                if markdown:
+                    yield markdown
         except Exception as e:
             error_msg = f"Error analyzing input: {e}"
             self.logger.error(error_msg)
-            st.error(error_msg)
-            return f"Unable to analyze input. Please try again. Error: {e}"
\ No newline at end of file
+            if chunks:
+                st.error(error_msg)
+                yield f"\n\nUnable to analyze input. Please try again. Error: {e}"
+                return None, ''.join(chunks)
+            st.info(OFFLINE_NOTE)
+            result = self._fallback_analysis(user_input, learning_language)
+            yield result[0].to_markdown()
+            return result
+
+        text = ''.join(chunks)
+        try:
+            analysis = parse_analysis(text)
+        except ValueError as e:
+            self.logger.warning(f"Unstructured analysis returned: {e}")
+            yield text
+            return None, text
+
+        yield renderer.finish(analysis)
+        result = analysis, text
+        self.analysis_memo.put(learning_language, user_input, result)
+        return result
+
+    def _pack_batch(self, items, token_budget, max_items_per_prompt):
+        """
+        Group batch items into prompt-sized chunks of a single language
+
+        Args:
+            items (list): (user_input, learning_language) pairs
+            token_budget (int): Approximate input tokens per chunk
+            max_items_per_prompt (int): Maximum sentences per chunk
+
+        Returns:
+            list: Chunks as (learning_language, [(index, user_input), ...])
+        """
+        chunks = []
+        open_chunks = {}
+        for index, (user_input, learning_language) in enumerate(items):
+            tokens = estimate_tokens(user_input)
+            chunk = open_chunks.get(learning_language)
+            if chunk is None or len(chunk[1]) >= max_items_per_prompt or chunk[2] + tokens > token_budget:
+                chunk = [learning_language, [], 0]
+                open_chunks[learning_language] = chunk
+                chunks.append(chunk)
+            chunk[1].append((index, user_input))
+            chunk[2] += tokens
+        return [(language, entries) for language, entries, _ in chunks]
+
+    def _batch_prompt(self, entries, learning_language):
+        """
+        Build one analysis prompt covering several numbered sentences
+        """
+        sentences = "\n".join(f"{number}. {user_input}" for number, (_, user_input) in enumerate(entries, 1))
+        return f"""
+        Comprehensive Language Learning Analysis for {learning_language}.
+        Analyze each numbered input sentence separately:
+        {sentences}
+
+        List every mistake in each sentence and respond with a JSON array
+        containing one object per sentence:
+        [{{"number": <sentence number>,
+           "corrected_sentence": "<corrected sentence>",
+           "mistakes": [{{"type": "<one of: {', '.join(MISTAKE_TYPES)}>",
+                         "original": "<wrong fragment>",
+                         "correction": "<corrected fragment>",
+                         "explanation": "<short explanation>"}}],
+           "tips": ["<short learning tip>"]}}]
+        """
+
+    def _analyze_chunk(self, learning_language, entries):
+        """
+        Analyze one packed chunk, falling back to per-sentence calls
+
+        Returns:
+            dict: Result dicts keyed by original item index
+        """
+        results = {}
+        if len(entries) > 1:
+            try:
+                response = self._generate(
+                    self._batch_prompt(entries, learning_language),
+                    generation_config={
+                        **ANALYSIS_GENERATION_CONFIG,
+                        'response_schema': BATCH_ANALYSIS_SCHEMA,
+                        'max_output_tokens': min(8192, BATCH_OUTPUT_TOKENS_PER_ITEM * len(entries))
+                    }
+                )
+                for number, analysis in parse_batch_analysis(response.text, len(entries)).items():
+                    index, user_input = entries[number - 1]
+                    results[index] = {
+                        'user_input': user_input,
+                        'learning_language': learning_language,
+                        'analysis': analysis,
+                        'error': None
+                    }
+            except Exception as e:
+                self.logger.warning(f"Batched analysis failed, analyzing sentences one by one: {e}")
+
+        # Sentences the batched answer did not cover
+        for index, user_input in entries:
+            if index in results:
+                continue
+            try:
+                response = self._generate(
+                    self._structured_analysis_prompt(user_input, learning_language),
+                    generation_config=ANALYSIS_GENERATION_CONFIG
+                )
+                results[index] = {
+                    'user_input': user_input,
+                    'learning_language': learning_language,
+                    'analysis': parse_analysis(response.text),
+                    'error': None
+                }
+            except Exception as e:
+                self.logger.error(f"Error analyzing input: {e}")
+                results[index] = {
+                    'user_input': user_input,
+                    'learning_language': learning_language,
+                    'analysis': None,
+                    'error': str(e)
+                }
+        return results
+
+    def analyze_batch(self, items, max_concurrency=BATCH_MAX_CONCURRENCY,
+                      token_budget=BATCH_PROMPT_TOKEN_BUDGET,
+                      max_items_per_prompt=BATCH_MAX_ITEMS_PER_PROMPT):
+        """
+        Analyze many submissions with packed prompts and concurrent calls
+
+        Sentences in the same language are packed into shared prompts while
+        they fit the token budget; the resulting chunks run concurrently.
+        A failure only affects the items it belongs to.
+
+        Args:
+            items (list): (user_input, learning_language) pairs
+            max_concurrency (int): Maximum chunks analyzed at once
+            token_budget (int): Approximate input tokens per packed prompt
+            max_items_per_prompt (int): Maximum sentences per packed prompt
+
+        Returns:
+            list: One dict per item, in input order, with ``user_input``,
+                ``learning_language``, ``analysis`` (an InputAnalysis, or None
+                on error) and ``error`` keys
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        if not self.model:
+            return [
+                {
+                    'user_input': user_input,
+                    'learning_language': learning_language,
+                    'analysis': None,
+                    'error': "AI model not initialized. Please verify your Gemini API key."
+                }
+                for user_input, learning_language in items
+            ]
+
+        chunks = self._pack_batch(items, token_budget, max_items_per_prompt)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            for chunk_results in executor.map(lambda chunk: self._analyze_chunk(*chunk), chunks):
+                results.update(chunk_results)
+
+        return [results[index] for index in range(len(items))]
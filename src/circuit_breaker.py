@@ -0,0 +1,163 @@
+import threading
+import time
+import logging
+from collections import deque
+from src.metrics import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Gauge values for the circuit state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the model while the circuit is open
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM circuit is open; next probe in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend and probes it until it recovers
+
+    Closed: calls go through and outcomes are kept for ``window_seconds``.
+    Once at least ``min_calls`` outcomes are in the window and the failure
+    rate reaches ``failure_rate_threshold``, the circuit opens.
+
+    Open: calls fail immediately with CircuitOpenError. After
+    ``open_seconds`` the circuit turns half-open.
+
+    Half-open: up to ``half_open_probes`` calls are let through. A success
+    closes the circuit; a failure reopens it with the open period doubled
+    (up to ``max_open_seconds``).
+    """
+
+    def __init__(self, name='llm', failure_rate_threshold=0.5, window_seconds=60, min_calls=5,
+                 open_seconds=15, max_open_seconds=300, half_open_probes=1):
+        """
+        Args:
+            name (str): Label for logs and metrics
+            failure_rate_threshold (float): Share of failed calls that opens the circuit
+            window_seconds (float): Age of outcomes counted in the failure rate
+            min_calls (int): Outcomes needed in the window before opening
+            open_seconds (float): First wait before probing
+            max_open_seconds (float): Cap on the wait after repeated failed probes
+            half_open_probes (int): Concurrent probe calls while half-open
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self._outcomes = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._current_open_seconds = open_seconds
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self._state:
+            self.logger.warning(f"Circuit {self.name} is now {state}")
+            self._state = state
+            metrics.set_gauge('circuit_state', STATE_VALUES[state], circuit=self.name)
+            metrics.increment('circuit_transitions_total', circuit=self.name, state=state)
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    @property
+    def state(self):
+        """
+        Current state, turning open into half-open once the wait is over
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._current_open_seconds:
+                self._set_state(HALF_OPEN)
+                self._probes = 0
+            return self._state
+
+    def retry_after(self):
+        """
+        Seconds until the next probe is allowed (0 unless open)
+        """
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self._current_open_seconds - time.monotonic())
+
+    def allow(self):
+        """
+        Whether a call may go through now; half-open probes must be
+        followed by ``record_success`` or ``record_failure``
+        """
+        state = self.state
+        with self._lock:
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            metrics.increment('circuit_rejections_total', circuit=self.name)
+            return False
+
+    def check(self):
+        """
+        Raise CircuitOpenError unless a call may go through now
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.retry_after())
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._outcomes.clear()
+                self._current_open_seconds = self.open_seconds
+                self._set_state(CLOSED)
+            self._outcomes.append((time.monotonic(), True))
+            self._trim(time.monotonic())
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                # Failed probe: wait longer before the next one
+                self._current_open_seconds = min(self.max_open_seconds, self._current_open_seconds * 2)
+                self._open(now)
+                return
+
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate_threshold):
+                self._open(now)
+
+    def _open(self, now):
+        self._opened_at = now
+        self._probes = 0
+        self._set_state(OPEN)
+
+    def snapshot(self):
+        """
+        State and window counts for display
+        """
+        state = self.state
+        with self._lock:
+            self._trim(time.monotonic())
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                'state': state,
+                'calls_in_window': len(self._outcomes),
+                'failures_in_window': failures
+            }
@@ -0,0 +1,258 @@
+import threading
+import logging
+from src.chatbot import estimate_tokens
+
+# Approximate prompt tokens kept as verbatim history before older turns are
+# folded into the running summary
+CONVERSATION_TOKEN_BUDGET = 1200
+
+# Most recent turns that always stay verbatim
+KEEP_RECENT_TURNS = 4
+
+CONVERSATION_GENERATION_CONFIG = {
+    'temperature': 0.8,
+    'max_output_tokens': 300
+}
+
+SUMMARY_GENERATION_CONFIG = {
+    'temperature': 0.2,
+    'max_output_tokens': 250
+}
+
+INSERT_TURN_QUERY = '''
+INSERT INTO conversation_turns (session_id, turn_index, role, content)
+VALUES (%s, %s, %s, %s)
+'''
+
+SAVE_SUMMARY_QUERY = '''
+INSERT INTO conversation_summaries (session_id, summary, summarized_turns)
+VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE summary = VALUES(summary), summarized_turns = VALUES(summarized_turns)
+'''
+
+
+class ConversationStore:
+    """
+    Persists conversation turns and the running summary per session
+    """
+
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager (DatabaseManager): Source of connections
+        """
+        self.db_manager = db_manager
+
+    def load(self, session_id):
+        """
+        Load the summary and the turns it does not cover yet
+
+        Only unsummarized turns are read (a primary key range), so loading
+        costs the same however long the conversation is.
+
+        Returns:
+            tuple: (summary, summarized_turns, list of (role, content))
+        """
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.execute(
+                "SELECT summary, summarized_turns FROM conversation_summaries WHERE session_id = %s",
+                (session_id,)
+            )
+            row = cursor.fetchone()
+            summary, summarized_turns = row if row else ('', 0)
+            cursor.execute('''
+                SELECT role, content FROM conversation_turns
+                WHERE session_id = %s AND turn_index >= %s
+                ORDER BY turn_index
+            ''', (session_id, summarized_turns))
+            return summary, summarized_turns, [tuple(turn) for turn in cursor.fetchall()]
+
+    def append(self, session_id, first_index, turns):
+        """
+        Insert new turns numbered from ``first_index``
+        """
+        # The turns reference the session row
+        self.db_manager.flush_write_behind()
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.executemany(INSERT_TURN_QUERY, [
+                (session_id, first_index + offset, role, content)
+                for offset, (role, content) in enumerate(turns)
+            ])
+            connection.commit()
+
+    def save_summary(self, session_id, summary, summarized_turns):
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.execute(SAVE_SUMMARY_QUERY, (session_id, summary, summarized_turns))
+            connection.commit()
+
+
+class ConversationSession:
+    """
+    Multi-turn conversation in the learning language with bounded context
+
+    Prompts carry a running summary plus the most recent turns. Whenever
+    the verbatim turns exceed ``token_budget``, the oldest ones are folded
+    into the summary, so prompt size stays roughly constant however long
+    the chat runs.
+    """
+
+    def __init__(self, chatbot, learning_language, proficiency_level, session_id=None, store=None,
+                 token_budget=CONVERSATION_TOKEN_BUDGET, keep_recent_turns=KEEP_RECENT_TURNS):
+        """
+        Args:
+            chatbot (LanguageLearningChatbot): Model access
+            learning_language (str): Language of the conversation
+            proficiency_level (str): Learner level the partner adapts to
+            session_id (int, optional): user_sessions id to persist under
+            store (ConversationStore, optional): Persistence; history is
+                kept in memory only without it
+            token_budget (int): Approximate tokens of verbatim history
+            keep_recent_turns (int): Turns never folded into the summary
+        """
+        self.logger = logging.getLogger(__name__)
+        self.chatbot = chatbot
+        self.learning_language = learning_language
+        self.proficiency_level = proficiency_level
+        self.session_id = session_id
+        self.store = store if session_id is not None else None
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary = ''
+        self.summarized_turns = 0
+        self.turns = []
+        self._lock = threading.Lock()
+
+        if self.store is not None:
+            self.summary, self.summarized_turns, self.turns = self.store.load(session_id)
+
+    @property
+    def turn_count(self):
+        """
+        Turns in the whole conversation, summarized or not
+        """
+        return self.summarized_turns + len(self.turns)
+
+    def history_tokens(self):
+        """
+        Approximate tokens of the verbatim history
+        """
+        return sum(estimate_tokens(content) for _, content in self.turns)
+
+    def _prompt(self, user_message):
+        """
+        Build the next-turn prompt from the summary and recent turns
+        """
+        history = "\n".join(
+            f"{'Learner' if role == 'user' else 'You'}: {content}" for role, content in self.turns
+        )
+        summary = f"Summary of the conversation so far:\n{self.summary}\n" if self.summary else ""
+        return f"""
+        You are a friendly conversation partner helping a {self.proficiency_level} learner
+        practice {self.learning_language}. Reply only in {self.learning_language}, in two to
+        four sentences suited to their level, and keep the conversation going with a question.
+        If the learner makes a mistake, model the correct form naturally in your reply.
+
+        {summary}
+        Recent turns:
+        {history}
+        Learner: {user_message}
+        You:
+        """
+
+    def _summary_prompt(self, turns):
+        """
+        Build the prompt that folds ``turns`` into the running summary
+        """
+        transcript = "\n".join(
+            f"{'Learner' if role == 'user' else 'Partner'}: {content}" for role, content in turns
+        )
+        return f"""
+        Update the summary of a {self.learning_language} practice conversation.
+        Keep topics discussed, facts the learner shared about themselves and
+        recurring mistakes. Write at most 120 words in English.
+
+        Current summary:
+        {self.summary or '(none)'}
+
+        New turns:
+        {transcript}
+
+        Updated summary:
+        """
+
+    def _record(self, user_message, reply):
+        """
+        Store a completed exchange and compact the history if needed
+
+        The exchange is written to the store first and only kept in memory
+        once that succeeded, so the two never disagree.
+
+        Raises:
+            Exception: Store errors; the exchange is not recorded
+        """
+        with self._lock:
+            first_index = self.turn_count
+            exchange = [('user', user_message), ('assistant', reply)]
+            if self.store is not None:
+                self.store.append(self.session_id, first_index, exchange)
+            self.turns.extend(exchange)
+            self._compact()
+
+    def _compact(self):
+        """
+        Fold the oldest turns into the summary while the history is over budget
+        """
+        if self.history_tokens() <= self.token_budget or len(self.turns) <= self.keep_recent_turns:
+            return
+
+        folded = len(self.turns) - self.keep_recent_turns
+        try:
+            summary = self.chatbot.generate(
+                self._summary_prompt(self.turns[:folded]),
+                generation_config=SUMMARY_GENERATION_CONFIG
+            )
+        except Exception as e:
+            # Keep the turns verbatim and try again after the next exchange
+            self.logger.warning(f"Conversation summary failed: {e}")
+            return
+
+        self.summary = summary.strip()
+        self.summarized_turns += folded
+        self.turns = self.turns[folded:]
+        if self.store is not None:
+            self.store.save_summary(self.session_id, self.summary, self.summarized_turns)
+        self.logger.info(f"Summarized {folded} turns of session {self.session_id}")
+
+    def reply(self, user_message):
+        """
+        Answer the learner's message
+
+        Returns:
+            str: The partner's reply
+
+        Raises:
+            Exception: Model or store errors; the exchange is not recorded
+        """
+        reply = self.chatbot.generate(
+            self._prompt(user_message),
+            generation_config=CONVERSATION_GENERATION_CONFIG
+        ).strip()
+        self._record(user_message, reply)
+        return reply
+
+    def stream_reply(self, user_message):
+        """
+        Streaming variant of ``reply``; the exchange is recorded once the
+        stream is complete
+
+        Yields:
+            str: Reply text chunks
+        """
+        chunks = []
+        for text in self.chatbot.generate_stream(
+            self._prompt(user_message),
+            generation_config=CONVERSATION_GENERATION_CONFIG
+        ):
+            chunks.append(text)
+            yield text
+        self._record(user_message, ''.join(chunks).strip())
@@ -1,11 +1,185 @@
-import mysql.connector
-import pandas as pd
-import streamlit as st
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
 import logging
 from datetime import datetime
+from src.analytics import learning_summary, record_sessions, refresh_mistake_stats
+from src.idempotency import get_ttl_map, session_idempotency_key
+from src.lazy import lazy_import
+from src.migrations import run_migrations, verify_query_plans
+from src.write_behind import BufferFullError, SessionIdAllocator, SessionWriteBehind
+from src.metrics import metrics
+from src.vocabulary import DUE_CARDS_QUERY
+
+# Heavy dependencies, imported on first use
+mysql = lazy_import('mysql')
+pooling = lazy_import('mysql.connector.pooling')
+pd = lazy_import('pandas')
+st = lazy_import('streamlit')
+
+SESSION_COLUMNS = [
+    'id', 'user_name', 'learning_language', 'native_language',
+    'proficiency_level', 'created_at', 'session_duration'
+]
+
+SESSIONS_QUERY = f"SELECT {', '.join(SESSION_COLUMNS)} FROM user_sessions ORDER BY created_at DESC, id DESC LIMIT %s"
+
+# Keyset pagination on (created_at, id), newest first
+SESSIONS_PAGE_QUERY = f"""
+    SELECT {', '.join(SESSION_COLUMNS)} FROM user_sessions
+    WHERE created_at < %s OR (created_at = %s AND id < %s)
+    ORDER BY created_at DESC, id DESC LIMIT %s
+"""
+
+SESSIONS_SCAN_QUERY = f"SELECT {', '.join(SESSION_COLUMNS)} FROM user_sessions ORDER BY created_at DESC, id DESC"
+
+# A repeated idempotency key returns the existing id through LAST_INSERT_ID();
+# the counter makes the duplicate report two affected rows
+UPSERT_SESSION_QUERY = '''
+INSERT INTO user_sessions
+(id, user_name, learning_language, native_language, proficiency_level, idempotency_key)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id), duplicate_submissions = duplicate_submissions + 1
+'''
+
+# Queries checked with EXPLAIN at startup: name -> (sql, sample params)
+INDEXED_QUERIES = {
+    'get_sessions': (SESSIONS_QUERY, (100,)),
+    'get_sessions_page': (SESSIONS_PAGE_QUERY, (datetime.now(), datetime.now(), 0, 50)),
+    'due_vocabulary_cards': (DUE_CARDS_QUERY, ('learner', 'Spanish', datetime.now(), 10)),
+}
+
+# Shared connection pools, keyed by connection config
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Shared session id allocators, keyed by connection config
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+# Shared write-behind buffers, keyed by connection config
+_write_behinds = {}
+_write_behinds_lock = threading.Lock()
+
+# Striped locks so concurrent duplicates of a session request share one id
+_session_key_locks = [threading.Lock() for _ in range(64)]
+
+# Databases whose schema has already been verified by this process
+_verified_schemas = set()
+_schema_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Bounded MySQL connection pool shared by every DatabaseManager with the
+    same connection config, with health checks and idle eviction
+    """
+
+    def __init__(self, config, pool_size=5, idle_timeout=300,
+                 health_check_interval=30, checkout_timeout=5):
+        """
+        Args:
+            config (dict): mysql.connector connection arguments
+            pool_size (int): Maximum number of open connections
+            idle_timeout (int): Seconds after which an idle connection is
+                replaced with a fresh one on checkout
+            health_check_interval (int): Seconds of idleness after which a
+                connection is pinged before use
+            checkout_timeout (int): Seconds to wait for a free connection
+        """
+        digest = hashlib.sha1(repr(sorted(config.items())).encode()).hexdigest()[:16]
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name=f"llb_{digest}",
+            pool_size=pool_size,
+            pool_reset_session=True,
+            **config
+        )
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self._last_used = {}
+        self._lock = threading.Lock()
+        logging.getLogger(__name__).info(
+            f"Connection pool of {pool_size} opened for database: {config.get('database')}"
+        )
+
+    def get_connection(self):
+        """
+        Check out a healthy connection, waiting up to ``checkout_timeout``
+
+        Returns:
+            PooledMySQLConnection: Connection; call ``release`` when done
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            try:
+                connection = self.pool.get_connection()
+                break
+            except pooling.PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+        with self._lock:
+            last_used = self._last_used.get(id(connection._cnx))
+        idle = time.monotonic() - last_used if last_used is not None else 0
+
+        try:
+            if idle > self.idle_timeout:
+                # Evict the idle session; the server may already have dropped it
+                connection.reconnect(attempts=1)
+            elif idle > self.health_check_interval:
+                connection.ping(reconnect=True, attempts=1)
+        except Exception:
+            # Give the slot back, flagged so its next checkout reconnects
+            self.release(connection, healthy=False)
+            raise
+        return connection
+
+    def release(self, connection, healthy=True):
+        """
+        Return a connection to the pool
+
+        Args:
+            connection (PooledMySQLConnection): Connection from ``get_connection``
+            healthy (bool): False to reconnect it on its next checkout
+        """
+        with self._lock:
+            self._last_used[id(connection._cnx)] = time.monotonic() if healthy else float('-inf')
+        try:
+            connection.close()
+        except Exception as e:
+            if healthy:
+                raise
+            # Resetting a dead session fails, but the slot is back in the pool
+            logging.getLogger(__name__).warning(f"Returned a broken pooled connection: {e}")
+
+
+def get_pool(config, **pool_options):
+    """
+    Return the process-wide pool for a connection config, creating it on first use
+
+    Args:
+        config (dict): mysql.connector connection arguments
+        **pool_options: Extra ConnectionPool settings (pool_size, idle_timeout, ...)
+
+    Returns:
+        ConnectionPool: Shared pool
+    """
+    key = tuple(sorted(config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(config, **pool_options)
+            _pools[key] = pool
+        return pool
+
 
 class DatabaseManager:
-    def __init__(self, host='localhost', user='root', password='Tulasi', database='language_learning_db'):
+    def __init__(self, host='localhost', user='root', password='Tulasi', database='language_learning_db',
+                 pooled=True, pool_size=5, idle_timeout=300, write_behind=False,
+                 connection_factory=None):
         """
         Enhanced database connection initialization with comprehensive logging
         
@@ -14,6 +188,15 @@ class DatabaseManager:
             user (str): Database username
             password (str): Database password
             database (str): Database name
+            pooled (bool): Share a bounded connection pool across sessions
+                instead of opening a dedicated connection
+            pool_size (int): Maximum connections in the shared pool
+            idle_timeout (int): Seconds before an idle pooled connection is replaced
+            write_behind (bool): Queue new sessions and insert them in
+                background batches (requires ``pooled``)
+            connection_factory (callable, optional): Replaces
+                ``mysql.connector.connect`` for dedicated connections (used
+                by benchmarks with an in-process database)
         """
         # Configure advanced logging
         logging.basicConfig(
@@ -25,73 +208,179 @@ class DatabaseManager:
             ]
         )
         self.logger = logging.getLogger(__name__)
+        self.pool = None
+        self.connection = None
+        self.write_behind = None
+        self.id_allocator = None
+        self.session_ids = get_ttl_map('session_ids')
 
         # Connection parameters validation
         if not all([host, user, database]):
             self.logger.error("Invalid database connection parameters")
             st.error("Database connection parameters are incomplete")
-            self.connection = None
-            self.cursor = None
             return
 
+        self.config = {
+            'host': host,
+            'user': user,
+            'password': password,
+            'database': database,
+            'connection_timeout': 10  # 10 seconds timeout
+        }
+
         try:
-            # Establish connection with timeout
-            self.connection = mysql.connector.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=database,
-                connection_timeout=10  # 10 seconds timeout
-            )
-            self.cursor = self.connection.cursor(dictionary=True)
+            with metrics.span('db_connect'):
+                if pooled and connection_factory is None:
+                    self.pool = get_pool(self.config, pool_size=pool_size, idle_timeout=idle_timeout)
+                else:
+                    # Establish a dedicated connection
+                    connect = connection_factory or mysql.connector.connect
+                    self.connection = connect(**self.config)
+                self.logger.info(f"Successfully connected to database: {database}")
             
-            # Create tables if not exists
-            self._create_tables()
+            # Create tables once per process
+            self._ensure_schema()
+            self._start_id_allocator()
             
-            self.logger.info(f"Successfully connected to database: {database}")
+            if write_behind:
+                self._start_write_behind()
             
         except mysql.connector.Error as err:
             error_msg = f"Database Connection Error: {err}"
             self.logger.error(error_msg)
             st.error(error_msg)
+            self.pool = None
             self.connection = None
-            self.cursor = None
 
-    def _create_tables(self):
+    def _start_id_allocator(self):
+        """
+        Attach the session id allocator (no database call until the first id)
+        """
+        if not self.pool:
+            # A dedicated connection lives for one rerun; reserve ids one at a time
+            self.id_allocator = SessionIdAllocator(self, block_size=1)
+            return
+
+        key = tuple(sorted(self.config.items()))
+        with _allocators_lock:
+            allocator = _allocators.get(key)
+            if allocator is None:
+                allocator = SessionIdAllocator(self)
+                _allocators[key] = allocator
+        self.id_allocator = allocator
+
+    def _start_write_behind(self):
         """
-        Robust table creation with comprehensive error handling
+        Attach the process-wide write-behind buffer for this database
         """
-        if not self.connection:
+        if not self.pool:
+            self.logger.warning("Write-behind needs a connection pool; writing sessions synchronously")
             return
 
+        key = tuple(sorted(self.config.items()))
+        with _write_behinds_lock:
+            buffer = _write_behinds.get(key)
+            if buffer is None:
+                buffer = SessionWriteBehind(self, allocator=self.id_allocator)
+                _write_behinds[key] = buffer
+        self.write_behind = buffer
+
+    def flush_write_behind(self):
+        """
+        Write buffered sessions now, e.g. before inserting rows that reference them
+        """
+        if self.write_behind is not None:
+            while self.write_behind.flush():
+                pass
+
+    @property
+    def is_connected(self):
+        """
+        Whether a pool or dedicated connection is available
+        """
+        return bool(self.pool or self.connection)
+
+    @contextmanager
+    def checkout(self):
+        """
+        Check out a connection for a single operation
+
+        Yields:
+            Connection, returned to the pool afterwards
+        """
+        connection = self.pool.get_connection() if self.pool else self.connection
+        try:
+            yield connection
+        finally:
+            if self.pool:
+                self.pool.release(connection)
+
+    @contextmanager
+    def cursor(self, dictionary=True):
+        """
+        Check out a connection with a fresh cursor for a single operation
+
+        Yields:
+            tuple: (connection, cursor)
+        """
+        with self.checkout() as connection:
+            cursor = connection.cursor(dictionary=dictionary)
+            try:
+                yield connection, cursor
+            finally:
+                cursor.close()
+
+    def _ensure_schema(self):
+        """
+        Migrate the schema only the first time this process sees the database
+        """
+        schema_key = (self.config['host'], self.config['database'])
+        with _schema_lock:
+            if schema_key in _verified_schemas:
+                return
+            if self._create_tables():
+                _verified_schemas.add(schema_key)
+
+    def _create_tables(self):
+        """
+        Apply pending schema migrations and check that queries use indexes
+
+        Returns:
+            bool: True if the schema is up to date
+        """
+        if not self.is_connected:
+            return False
+
         try:
-            # Updated table creation SQL to match the insert query
-            create_sessions_table = '''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_name VARCHAR(100) NOT NULL,
-                learning_language VARCHAR(50) NOT NULL,
-                native_language VARCHAR(50) NOT NULL,
-                proficiency_level VARCHAR(20) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                session_duration INT DEFAULT 0
+            with metrics.span('db_ddl'), self.checkout() as connection:
+                applied = run_migrations(connection)
+                verify_query_plans(connection, INDEXED_QUERIES)
+            self.logger.info(
+                f"Tables created/verified successfully ({len(applied)} migrations applied)"
             )
-            '''
-            
-            self.cursor.execute(create_sessions_table)
-            self.connection.commit()
-            self.logger.info("Tables created/verified successfully")
+            return True
             
         except mysql.connector.Error as err:
             error_msg = f"Error creating tables: {err}"
             self.logger.error(error_msg)
             st.error(error_msg)
+            return False
 
-    def create_session(self, user_name, learning_language, native_language, proficiency_level):
+    def create_session(self, user_name, learning_language, native_language, proficiency_level,
+                       idempotency_key=None):
         """
         Enhanced session creation with comprehensive validation
+
+        Repeated requests with the same idempotency key return the existing
+        session id. Keys this process has seen are answered from memory
+        without touching the database; others are resolved by the unique
+        index on ``user_sessions.idempotency_key``.
+
+        Args:
+            idempotency_key (str, optional): Key from ``session_idempotency_key``;
+                derived from the other arguments when omitted
         """
-        if not self.connection:
+        if not self.is_connected:
             st.error("No active database connection")
             return None
         
@@ -100,19 +389,74 @@ class DatabaseManager:
             st.error("All fields are required for session creation")
             return None
         
+        if idempotency_key is None:
+            idempotency_key = session_idempotency_key(
+                user_name, learning_language, native_language, proficiency_level
+            )
+        with _session_key_locks[hash(idempotency_key) % len(_session_key_locks)]:
+            session_id = self.session_ids.get(self._dedup_key(idempotency_key))
+            if session_id is not None:
+                metrics.increment('sessions_deduplicated_total', layer='memory')
+                self.logger.info(f"Duplicate session request from {user_name}, reusing ID: {session_id}")
+                return session_id
+
+            session_id = self._insert_session(
+                (user_name, learning_language, native_language, proficiency_level), idempotency_key
+            )
+            if session_id is not None:
+                self.remember_session(idempotency_key, session_id)
+            return session_id
+
+    def _dedup_key(self, idempotency_key):
+        return self.config['host'], self.config['database'], idempotency_key
+
+    def remember_session(self, idempotency_key, session_id):
+        """
+        Answer later requests with an idempotency key from memory
+
+        Args:
+            idempotency_key (str): Key of the session request
+            session_id (int): Session the key resolves to
+        """
+        self.session_ids.put(self._dedup_key(idempotency_key), session_id)
+
+    def _insert_session(self, values, idempotency_key):
+        """
+        Queue or upsert a session row
+
+        Returns:
+            int or None: Session id, None on database errors
+        """
+        user_name = values[0]
+        if self.write_behind:
+            try:
+                with metrics.span('db_enqueue'):
+                    session_id = self.write_behind.submit(*values, idempotency_key=idempotency_key)
+                self.logger.info(f"Session queued for {user_name} with ID: {session_id}")
+                return session_id
+            except BufferFullError as err:
+                self.logger.warning(f"Write-behind buffer full, inserting directly: {err}")
+            except mysql.connector.Error as err:
+                error_msg = f"Session Creation Error: {err}"
+                self.logger.error(error_msg)
+                st.error(error_msg)
+                return None
+        
         try:
-            query = '''
-            INSERT INTO user_sessions 
-            (user_name, learning_language, native_language, proficiency_level) 
-            VALUES (%s, %s, %s, %s)
-            '''
-            values = (user_name, learning_language, native_language, proficiency_level)
+            reserved_id = self.id_allocator.next_id()
+            with metrics.span('db_insert'), self.cursor() as (connection, cursor):
+                cursor.execute(UPSERT_SESSION_QUERY, (reserved_id,) + values + (idempotency_key,))
+                created = cursor.rowcount == 1
+                session_id = reserved_id if created else cursor.lastrowid
+                if created:
+                    record_sessions(cursor, [values])
+                connection.commit()
             
-            self.cursor.execute(query, values)
-            self.connection.commit()
-            
-            session_id = self.cursor.lastrowid
-            self.logger.info(f"Session created for {user_name} with ID: {session_id}")
+            if created:
+                self.logger.info(f"Session created for {user_name} with ID: {session_id}")
+            else:
+                metrics.increment('sessions_deduplicated_total', layer='database')
+                self.logger.info(f"Duplicate session request from {user_name}, reusing ID: {session_id}")
             return session_id
         
         except mysql.connector.Error as err:
@@ -125,16 +469,17 @@ class DatabaseManager:
         """
         Retrieve learning sessions with optional limit and error handling
         """
-        if not self.connection:
+        if not self.is_connected:
             st.error("No active database connection")
             return pd.DataFrame()
         
         try:
-            query = "SELECT * FROM user_sessions ORDER BY created_at DESC LIMIT %s"
-            self.cursor.execute(query, (limit,))
-            sessions = self.cursor.fetchall()
+            with metrics.span('db_select'), self.cursor(dictionary=False) as (connection, cursor):
+                cursor.execute(SESSIONS_QUERY, (limit,))
+                sessions = cursor.fetchall()
+                columns = cursor.column_names
             
-            return pd.DataFrame(sessions)
+            return pd.DataFrame.from_records(sessions, columns=columns)
         
         except mysql.connector.Error as err:
             error_msg = f"Sessions Retrieval Error: {err}"
@@ -142,15 +487,155 @@ class DatabaseManager:
             st.error(error_msg)
             return pd.DataFrame()
 
+    def get_sessions_page(self, limit=50, cursor=None):
+        """
+        Retrieve one page of sessions, newest first, using keyset pagination
+
+        Each page is an index range scan from the previous page's last row,
+        so deep pages cost the same as the first one.
+
+        Args:
+            limit (int): Rows per page
+            cursor (tuple, optional): ``(created_at, id)`` of the last row of
+                the previous page; None for the first page
+
+        Returns:
+            tuple: (DataFrame, next_cursor), next_cursor being None on the last page
+        """
+        if not self.is_connected:
+            st.error("No active database connection")
+            return pd.DataFrame(columns=SESSION_COLUMNS), None
+
+        try:
+            with metrics.span('db_select'), self.cursor(dictionary=False) as (connection, db_cursor):
+                if cursor is None:
+                    db_cursor.execute(f"{SESSIONS_SCAN_QUERY} LIMIT %s", (limit,))
+                else:
+                    created_at, session_id = cursor
+                    db_cursor.execute(SESSIONS_PAGE_QUERY, (created_at, created_at, session_id, limit))
+                rows = db_cursor.fetchall()
+
+            sessions = pd.DataFrame.from_records(rows, columns=SESSION_COLUMNS)
+            next_cursor = None
+            if len(rows) == limit:
+                last_row = rows[-1]
+                next_cursor = (last_row[SESSION_COLUMNS.index('created_at')], last_row[0])
+            return sessions, next_cursor
+
+        except mysql.connector.Error as err:
+            error_msg = f"Sessions Retrieval Error: {err}"
+            self.logger.error(error_msg)
+            st.error(error_msg)
+            return pd.DataFrame(columns=SESSION_COLUMNS), None
+
+    def get_analytics(self, days=30):
+        """
+        Learning analytics for the dashboard, read from the summary tables
+
+        Mistakes recorded since the last call are folded in first; session
+        figures are already current because every insert updates them.
+
+        Args:
+            days (int): Days of session history to cover
+
+        Returns:
+            dict: See ``src.analytics.learning_summary``; empty on error
+        """
+        if not self.is_connected:
+            st.error("No active database connection")
+            return {}
+
+        try:
+            with metrics.span('db_analytics'):
+                with self.checkout() as connection:
+                    refresh_mistake_stats(connection)
+                with self.cursor(dictionary=False) as (connection, cursor):
+                    return learning_summary(cursor, days)
+
+        except mysql.connector.Error as err:
+            error_msg = f"Analytics Retrieval Error: {err}"
+            self.logger.error(error_msg)
+            st.error(error_msg)
+            return {}
+
+    def iter_session_batches(self, batch_size=1000):
+        """
+        Stream all sessions, newest first, through a server-side cursor
+
+        Rows are read from an unbuffered cursor ``batch_size`` at a time, so
+        memory stays bounded however large the table is.
+
+        Args:
+            batch_size (int): Rows per batch
+
+        Yields:
+            dict: Column name -> list of values for one batch
+        """
+        if not self.is_connected:
+            return
+
+        with self.checkout() as connection:
+            cursor = connection.cursor(buffered=False)
+            exhausted = False
+            try:
+                cursor.execute(SESSIONS_SCAN_QUERY)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        exhausted = True
+                        break
+                    yield {
+                        column: [row[index] for row in rows]
+                        for index, column in enumerate(SESSION_COLUMNS)
+                    }
+            finally:
+                if not exhausted:
+                    # Drain the stream so the connection can be reused
+                    connection.consume_results()
+                cursor.close()
+
+    def get_sessions_frame(self, batch_size=1000, max_rows=None):
+        """
+        Build a DataFrame of sessions column by column from streamed batches
+
+        Args:
+            batch_size (int): Rows fetched per round trip
+            max_rows (int, optional): Stop after this many rows
+
+        Returns:
+            pd.DataFrame: Sessions, newest first
+        """
+        columns = {column: [] for column in SESSION_COLUMNS}
+        row_count = 0
+        batches = self.iter_session_batches(batch_size)
+        try:
+            for batch in batches:
+                for column, values in batch.items():
+                    columns[column].extend(values)
+                row_count += len(batch['id'])
+                if max_rows is not None and row_count >= max_rows:
+                    break
+            # Release the connection before building the frame
+            batches.close()
+        except mysql.connector.Error as err:
+            error_msg = f"Sessions Retrieval Error: {err}"
+            self.logger.error(error_msg)
+            st.error(error_msg)
+            return pd.DataFrame(columns=SESSION_COLUMNS)
+
+        sessions = pd.DataFrame(columns)
+        return sessions.head(max_rows) if max_rows is not None else sessions
+
     def close_connection(self):
         """
         Advanced method to safely close database connection
+
+        Pooled connections are shared with other sessions and stay open.
         """
         try:
             if self.connection and self.connection.is_connected():
-                self.cursor.close()
                 self.connection.close()
                 self.logger.info("Database connection closed successfully")
         except Exception as e:
             error_msg = f"Error closing database connection: {e}"
-            self.logger.error(error_msg)
\ No newline at end of file
+            self.logger.error(error_msg)
@@ -0,0 +1,178 @@
+import random
+import re
+from src.mistakes import InputAnalysis, Mistake
+
+# Shown with every degraded-mode answer
+OFFLINE_NOTE = "Offline practice mode: the AI tutor is unavailable, so this is a built-in exercise."
+OFFLINE_TIP = "This is a quick offline check; full feedback returns when the AI tutor is back."
+
+# Hand-written scenes served while the model is unavailable:
+# language -> (context, dialogue lines, vocabulary pairs)
+PREBUILT_SCENES = {
+    'Spanish': [
+        ("Ordering at a café in Madrid",
+         ["Person A: Hola, buenos días. ¿Qué desea tomar?",
+          "Person B: Buenos días. Un café con leche, por favor.",
+          "Person A: ¿Algo para comer?",
+          "Person B: Sí, una tostada. ¿Cuánto es?"],
+         [("¿Qué desea?", "What would you like?"), ("por favor", "please"), ("¿Cuánto es?", "How much is it?")]),
+        ("Asking for directions",
+         ["Person A: Perdone, ¿dónde está la estación?",
+          "Person B: Está a la derecha, cerca del parque.",
+          "Person A: ¿Está lejos?",
+          "Person B: No, está a cinco minutos a pie."],
+         [("¿dónde está...?", "where is...?"), ("a la derecha", "to the right"), ("a pie", "on foot")]),
+    ],
+    'French': [
+        ("Buying bread at a bakery",
+         ["Person A: Bonjour ! Vous désirez ?",
+          "Person B: Bonjour, une baguette, s'il vous plaît.",
+          "Person A: Et avec ceci ?",
+          "Person B: C'est tout, merci. Ça fait combien ?"],
+         [("Vous désirez ?", "What would you like?"), ("s'il vous plaît", "please"), ("Ça fait combien ?", "How much is it?")]),
+    ],
+    'German': [
+        ("Checking in at a hotel",
+         ["Person A: Guten Tag! Haben Sie eine Reservierung?",
+          "Person B: Ja, auf den Namen Müller.",
+          "Person A: Ihr Zimmer ist im zweiten Stock.",
+          "Person B: Vielen Dank! Wann gibt es Frühstück?"],
+         [("die Reservierung", "reservation"), ("das Zimmer", "room"), ("das Frühstück", "breakfast")]),
+    ],
+    'Italian': [
+        ("Ordering at a restaurant",
+         ["Person A: Buonasera, siete pronti per ordinare?",
+          "Person B: Sì, vorrei una pizza margherita.",
+          "Person A: E da bere?",
+          "Person B: Un'acqua frizzante, grazie."],
+         [("vorrei", "I would like"), ("da bere", "to drink"), ("il conto", "the bill")]),
+    ],
+    'Portuguese': [
+        ("Meeting a new colleague",
+         ["Person A: Olá, eu sou a Ana. Como você se chama?",
+          "Person B: Prazer, eu me chamo Pedro.",
+          "Person A: De onde você é?",
+          "Person B: Eu sou de Lisboa. E você?"],
+         [("Como você se chama?", "What is your name?"), ("Prazer", "Nice to meet you"), ("De onde você é?", "Where are you from?")]),
+    ],
+    'Chinese': [
+        ("Shopping at a market",
+         ["Person A: 你好！这个多少钱？ (Nǐ hǎo! Zhège duōshǎo qián?)",
+          "Person B: 二十块。 (Èrshí kuài.)",
+          "Person A: 太贵了，便宜一点吧。 (Tài guì le, piányi yīdiǎn ba.)",
+          "Person B: 好吧，十五块。 (Hǎo ba, shíwǔ kuài.)"],
+         [("多少钱 (duōshǎo qián)", "how much money"), ("太贵了 (tài guì le)", "too expensive"), ("便宜 (piányi)", "cheap")]),
+    ],
+}
+
+LEVEL_OBJECTIVES = {
+    'Beginner': "Repeat each line aloud, then write the dialogue from memory.",
+    'Intermediate': "Continue the dialogue with two more exchanges of your own.",
+    'Advanced': "Rewrite the dialogue in a more formal register and add a complication.",
+}
+
+# Common learner errors: language -> [(pattern, replacement template, type, explanation)]
+RULES = {
+    'Spanish': [
+        (r'\byo (es|eres|son)\b', 'yo soy', 'conjugation', "With 'yo', 'ser' is 'soy'."),
+        (r'\byo (esta|está|estas|están)\b', 'yo estoy', 'conjugation', "With 'yo', 'estar' is 'estoy'."),
+        (r'\byo tiene\b', 'yo tengo', 'conjugation', "With 'yo', 'tener' is 'tengo'."),
+        (r'\bla problema\b', 'el problema', 'agreement', "'Problema' is masculine."),
+    ],
+    'French': [
+        (r'\bje (est|es)\b', 'je suis', 'conjugation', "With 'je', 'être' is 'suis'."),
+        (r'\bje a\b', "j'ai", 'conjugation', "With 'je', 'avoir' is 'ai' and elides to 'j'ai'."),
+        (r"\bje ([aeiouéèh]\w*)", r"j'\1", 'spelling', "'Je' elides before a vowel or mute h: j'aime, j'habite."),
+    ],
+    'German': [
+        (r'\bich (bist|ist|sind)\b', 'ich bin', 'conjugation', "With 'ich', 'sein' is 'bin'."),
+        (r'\bich (hast|hat)\b', 'ich habe', 'conjugation', "With 'ich', 'haben' is 'habe'."),
+    ],
+    'Italian': [
+        (r'\bio (è|sei|e)\b', 'io sono', 'conjugation', "With 'io', 'essere' is 'sono'."),
+        (r'\bio (ha|hai)\b', 'io ho', 'conjugation', "With 'io', 'avere' is 'ho'."),
+    ],
+    'Portuguese': [
+        (r'\beu (é|e|és)\b', 'eu sou', 'conjugation', "With 'eu', 'ser' is 'sou'."),
+        (r'\beu (está|esta)\b', 'eu estou', 'conjugation', "With 'eu', 'estar' is 'estou'."),
+    ],
+}
+
+_REPEATED_WORD = re.compile(r'\b(\w+)\s+\1\b', re.IGNORECASE)
+
+
+def prebuilt_scene(learning_language, proficiency_level):
+    """
+    A built-in scene in the same format as generated ones
+
+    Returns:
+        str: Scene text
+    """
+    scenes = PREBUILT_SCENES.get(learning_language) or PREBUILT_SCENES['Spanish']
+    context, dialogue, vocabulary = random.choice(scenes)
+    lines = [f"Scenario Context: {context}", "Dialogue:"]
+    lines.extend(dialogue)
+    lines.extend([
+        "Learning Objectives:",
+        f"- {LEVEL_OBJECTIVES.get(proficiency_level, LEVEL_OBJECTIVES['Beginner'])}",
+        "Key Vocabulary:"
+    ])
+    lines.extend(f"- {term}: {meaning}" for term, meaning in vocabulary)
+    return "\n".join(lines)
+
+
+def _apply(sentence, start, end, replacement):
+    return sentence[:start] + replacement + sentence[end:]
+
+
+def check_sentence(user_input, learning_language):
+    """
+    Rule-based check for frequent learner mistakes, used while the model
+    is unavailable
+
+    Covers capitalization, end punctuation, repeated words, Spanish
+    opening marks and a short list of per-language conjugation errors.
+
+    Returns:
+        InputAnalysis: Mistakes found and the corrected sentence
+    """
+    sentence = ' '.join(user_input.split())
+    mistakes = []
+
+    for pattern, template, mistake_type, explanation in RULES.get(learning_language, []):
+        match = re.search(pattern, sentence, re.IGNORECASE)
+        if match is None:
+            continue
+        original = match.group(0)
+        correction = match.expand(template)
+        if original[0].isupper():
+            correction = correction[0].upper() + correction[1:]
+        mistakes.append(Mistake(mistake_type, original, correction, explanation))
+        sentence = _apply(sentence, match.start(), match.end(), correction)
+
+    repeated = _REPEATED_WORD.search(sentence)
+    if repeated:
+        mistakes.append(Mistake('style', repeated.group(0), repeated.group(1), "The word is repeated."))
+        sentence = _apply(sentence, repeated.start(), repeated.end(), repeated.group(1))
+
+    # Capitalization is checked after Spanish opening marks
+    start = len(sentence) - len(sentence.lstrip('¿¡'))
+    if start < len(sentence) and sentence[start].islower():
+        first_word = sentence[start:].split(' ', 1)[0]
+        mistakes.append(Mistake('spelling', first_word, first_word[0].upper() + first_word[1:],
+                                "Sentences start with a capital letter."))
+        sentence = sentence[:start] + sentence[start].upper() + sentence[start + 1:]
+
+    if learning_language == 'Spanish':
+        for closing, opening in (('?', '¿'), ('!', '¡')):
+            if sentence.endswith(closing) and opening not in sentence:
+                mistakes.append(Mistake('punctuation', closing, f"{opening}…{closing}",
+                                        f"Spanish questions and exclamations open with '{opening}'."))
+                sentence = opening + sentence
+
+    if sentence and sentence[-1] not in '.!?。！？…':
+        mistakes.append(Mistake('punctuation', sentence.split(' ')[-1], sentence.split(' ')[-1] + '.',
+                                "End the sentence with a punctuation mark."))
+        sentence += '.'
+
+    return InputAnalysis(sentence, mistakes, [OFFLINE_TIP], offline=True)
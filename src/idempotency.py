@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from src.metrics import metrics
+
+# Resubmissions of the same session within this many seconds are duplicates
+IDEMPOTENCY_WINDOW = 600
+
+# Process-wide maps, keyed by name
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def session_idempotency_key(user_name, learning_language, native_language, proficiency_level,
+                            window=IDEMPOTENCY_WINDOW, now=None):
+    """
+    Idempotency key of a session request
+
+    Requests from the same learner with the same languages and level in
+    the same ``window``-second slot share a key. Slots are aligned to the
+    epoch, so a resubmission just after a slot boundary starts a new session.
+
+    Returns:
+        str: 40-character hex digest
+    """
+    slot = int((time.time() if now is None else now) // window)
+    fields = (' '.join(user_name.split()).casefold(), learning_language, native_language, proficiency_level, str(slot))
+    return hashlib.sha1('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
+
+def get_ttl_map(name, **options):
+    """
+    Return the process-wide TTL map with a name
+
+    Args:
+        name (str): Map name (also the ``cache`` metrics label)
+        **options: TTLMap settings used on first creation
+    """
+    with _maps_lock:
+        ttl_map = _maps.get(name)
+        if ttl_map is None:
+            ttl_map = TTLMap(name, **options)
+            _maps[name] = ttl_map
+        return ttl_map
+
+
+class TTLMap:
+    """
+    Bounded in-memory map whose entries expire after ``ttl`` seconds
+
+    The least recently written entries are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, name, max_entries=10000, ttl=IDEMPOTENCY_WINDOW):
+        """
+        Args:
+            name (str): Label for metrics
+            max_entries (int): Entries kept
+            ttl (int): Seconds before an entry expires
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Value stored under a key
+
+        Returns:
+            The value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+        metrics.increment('cache_requests_total', cache=self.name, result='hit' if entry else 'miss')
+        return entry[1] if entry is not None else None
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the oldest entries beyond ``max_entries``
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic(), value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.increment('cache_evictions_total', cache=self.name)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,127 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Modules imported by every app process before the first render
+STARTUP_MODULES = ['src.chatbot', 'src.database', 'src.metrics']
+
+# Heavy SDKs that must only be imported on first use
+DEFERRED_MODULES = ['google.generativeai', 'grpc', 'mysql.connector', 'pandas']
+
+# Default start-up budget for STARTUP_MODULES (milliseconds)
+DEFAULT_BUDGET_MS = 300
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(output):
+    """
+    Parse ``python -X importtime`` output
+
+    Returns:
+        list: (module, cumulative_us, depth) per imported module, in the
+            order the interpreter finished importing them
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|', 2)
+            cumulative_us = int(cumulative.strip())
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), cumulative_us, depth))
+    return imports
+
+
+def measure(modules=None):
+    """
+    Import ``modules`` in a fresh interpreter with ``-X importtime``
+
+    Returns:
+        list: Parsed imports, see ``parse_importtime``
+    """
+    statement = f"import {', '.join(modules or STARTUP_MODULES)}"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"'{statement}' failed:\n{result.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+
+def startup_ms(imports, modules=None):
+    """
+    Cumulative import time of the requested modules, excluding interpreter
+    start-up (site, encodings)
+    """
+    modules = set(modules or STARTUP_MODULES)
+    return sum(cumulative for name, cumulative, depth in imports if depth == 0 and name in modules) / 1000
+
+
+def check(imports, budget_ms, modules=None, deferred=None):
+    """
+    Check one measurement against the budget and the deferred modules
+
+    Returns:
+        tuple: (total_ms, list of problem descriptions)
+    """
+    total_ms = startup_ms(imports, modules)
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"start-up imports took {total_ms:.0f}ms (budget {budget_ms}ms)")
+
+    imported = {name for name, _, _ in imports}
+    for module in deferred or DEFERRED_MODULES:
+        if module in imported:
+            problems.append(f"{module} is imported at start-up; import it lazily (src.lazy.lazy_import)")
+    return total_ms, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when app start-up imports exceed their time budget")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help="Allowed import time (ms)")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters to measure; the median counts")
+    parser.add_argument('--top', type=int, default=10, help="Slowest direct imports to list per module")
+    parser.add_argument('modules', nargs='*', help=f"Modules to import (default: {' '.join(STARTUP_MODULES)})")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or STARTUP_MODULES
+    runs = [measure(modules) for _ in range(max(1, args.repeat))]
+    totals = [startup_ms(run, modules) for run in runs]
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    total_ms, problems = check(median_run, args.budget_ms, modules)
+
+    # Each requested module with its slowest direct imports (children are
+    # reported before their parent)
+    print(f"\n{'module':<40}{'cumulative ms':>15}")
+    children = []
+    for name, cumulative, depth in median_run:
+        if depth == 1:
+            children.append((name, cumulative))
+        elif depth == 0:
+            if name in modules:
+                print(f"{name:<40}{cumulative / 1000:>15.1f}")
+                for child, child_cumulative in sorted(children, key=lambda entry: -entry[1])[:args.top]:
+                    print(f"{'  ' + child:<40}{child_cumulative / 1000:>15.1f}")
+            children = []
+    print(f"{'total':<40}{total_ms:>15.1f}  (median of {len(runs)}, budget {args.budget_ms:.0f})")
+    print(f"runs: {', '.join(f'{total:.0f}ms' for total in totals)}")
+
+    if problems:
+        print("\n❌ Import budget exceeded:")
+        for problem in problems:
+            print(f"   🔹 {problem}")
+        return 1
+    print("\n✅ Start-up imports within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+import importlib
+import sys
+import threading
+import types
+from src.metrics import metrics
+
+_import_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    Heavy SDKs (google.generativeai, mysql.connector, pandas) cost hundreds
+    of milliseconds to import; deferring them keeps process start-up and
+    the first Streamlit render fast. Submodules are imported on demand too,
+    so ``lazy_import('mysql').connector.Error`` works like the real thing.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    with metrics.span('lazy_import', module=self.__name__):
+                        module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        """
+        Whether the real module has been imported yet
+        """
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        module = self._load()
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            # Submodule that its package does not import itself
+            submodule = f"{self.__name__}.{attr}"
+            try:
+                return importlib.import_module(submodule)
+            except ModuleNotFoundError as error:
+                if error.name != submodule:
+                    raise
+                raise AttributeError(f"module '{self.__name__}' has no attribute '{attr}'") from None
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    Module proxy that imports ``name`` the first time it is used
+
+    Returns the real module if it has already been imported.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -1,8 +1,16 @@
 import os
+import sys
 import mysql.connector
 import groq  # Import Groq API client
 from dotenv import load_dotenv
 
+if not __package__:
+    # Run as ``python src/main.py``: make the ``src`` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.migrations import run_migrations
+from src.providers import GroqProvider
+
 # Load environment variables
 load_dotenv()
 
@@ -45,27 +53,8 @@ class DatabaseManager:
 
     def create_tables(self):
         try:
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    session_id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_name VARCHAR(100),
-                    learning_language VARCHAR(50),
-                    native_language VARCHAR(50),
-                    proficiency_level VARCHAR(20)
-                )
-            ''')
-
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS language_mistakes (
-                    mistake_id INT AUTO_INCREMENT PRIMARY KEY,
-                    session_id INT,
-                    mistake_type VARCHAR(50),
-                    mistake_description TEXT,
-                    correction TEXT,
-                    FOREIGN KEY (session_id) REFERENCES user_sessions(session_id)
-                )
-            ''')
-            self.connection.commit()
+            # Shared migrations keep this schema in sync with src/database.py
+            run_migrations(self.connection)
             print("✅ Tables ensured in the database.")
 
         except mysql.connector.Error as err:
@@ -79,13 +68,13 @@ class DatabaseManager:
             print("🔴 Database connection closed.")
 
 class LanguageLearningChatbot:
+    def __init__(self):
+        # Same provider interface the Gemini chatbot uses
+        self.provider = GroqProvider(client=groq_client, model="llama-3.2-11b-vision-preview")
+
     def generate_response(self, prompt):
         try:
-            response = groq_client.chat.completions.create(
-                model="llama-3.2-11b-vision-preview",  # Using Mixtral model
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.choices[0].message.content
+            return self.provider.generate(prompt).text
         except Exception as e:
             print(f"❌ Error generating response from Groq API: {e}")
             return "Sorry, I'm having trouble responding right now."
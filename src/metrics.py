@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket bounds for stage durations (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(label_key, extra=None):
+    items = list(label_key) + list(extra or [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in items) + '}'
+
+
+class Metrics:
+    """
+    Process-wide counters, duration histograms and recent request traces
+
+    Stage timings are recorded with ``span``; spans opened inside ``trace``
+    are also grouped into a per-request breakdown kept for the last
+    ``recent_traces`` requests.
+    """
+
+    def __init__(self, recent_traces=20):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._local = threading.local()
+        self.traces = deque(maxlen=recent_traces)
+
+    def increment(self, name, value=1, **labels):
+        """
+        Add to a counter
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """
+        Set a gauge to its current value
+        """
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        """
+        Record a duration in a histogram
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = {'buckets': [0] * len(DURATION_BUCKETS), 'count': 0, 'sum': 0.0}
+                self._histograms[key] = histogram
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """
+        Time a stage, e.g. ``with metrics.span('llm_call', model=name):``
+
+        Failures are counted in ``stage_errors_total`` and re-raised.
+        """
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe('stage_duration_seconds', elapsed, stage=stage, **labels)
+            if failed:
+                self.increment('stage_errors_total', stage=stage, **labels)
+            current = getattr(self._local, 'trace', None)
+            if current is not None:
+                current['stages'].append((stage, round(elapsed * 1000, 2), failed))
+
+    @contextmanager
+    def trace(self, name):
+        """
+        Group the spans of one request (e.g. one Streamlit rerun)
+        """
+        if getattr(self._local, 'trace', None) is not None:
+            # Nested trace: keep recording into the outer one
+            yield
+            return
+
+        current = {'name': name, 'started_at': time.strftime('%H:%M:%S'), 'stages': []}
+        self._local.trace = current
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.trace = None
+            current['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            with self._lock:
+                self.traces.append(current)
+
+    def recent_traces(self):
+        """
+        Stage breakdowns of the most recent requests, newest first
+        """
+        with self._lock:
+            return list(reversed(self.traces))
+
+    def prometheus_text(self):
+        """
+        Render every metric in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: dict(value, buckets=list(value['buckets'])) for key, value in self._histograms.items()}
+
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE llb_{name} {kind}")
+                for (metric_name, label_key), value in sorted(values.items()):
+                    if metric_name == name:
+                        lines.append(f"llb_{name}{_format_labels(label_key)} {value}")
+
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE llb_{name} histogram")
+            for (metric_name, label_key), histogram in sorted(histograms.items()):
+                if metric_name != name:
+                    continue
+                for bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+                    lines.append(f"llb_{name}_bucket{_format_labels(label_key, [('le', bound)])} {count}")
+                lines.append(f"llb_{name}_bucket{_format_labels(label_key, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"llb_{name}_sum{_format_labels(label_key)} {histogram['sum']:.6f}")
+                lines.append(f"llb_{name}_count{_format_labels(label_key)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Write the metrics to a file (e.g. for the node exporter textfile collector)
+        """
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'w') as metrics_file:
+            metrics_file.write(self.prometheus_text())
+        os.replace(temporary_path, path)
+
+    def serve(self, port=9108, host='0.0.0.0'):
+        """
+        Serve ``/metrics`` over HTTP from a background thread
+
+        Returns:
+            ThreadingHTTPServer: The running server
+        """
+        # Imported here: http.server alone would double the module's import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        self.logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
+
+
+# Shared registry used by the chatbot and database modules
+metrics = Metrics()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port):
+    """
+    Serve the shared registry on ``port`` once per process
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = metrics.serve(port)
+        return _server
@@ -0,0 +1,402 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Serializes migrations across processes sharing a database
+MIGRATION_LOCK = 'language_learning_schema_migrations'
+
+
+def _table_exists(cursor, table):
+    cursor.execute(
+        "SELECT COUNT(*) AS found FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return _scalar(cursor) > 0
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute(
+        "SELECT COUNT(*) AS found FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return _scalar(cursor) > 0
+
+
+def _index_exists(cursor, table, columns):
+    """
+    Whether an index on ``table`` starts with exactly ``columns``, in order
+    """
+    cursor.execute(
+        "SELECT index_name, seq_in_index, column_name FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s "
+        "ORDER BY index_name, seq_in_index",
+        (table,)
+    )
+    indexes = {}
+    for row in cursor.fetchall():
+        values = list(row.values()) if isinstance(row, dict) else list(row)
+        indexes.setdefault(values[0], []).append(values[2])
+    return any(index[:len(columns)] == list(columns) for index in indexes.values())
+
+
+def _scalar(cursor):
+    row = cursor.fetchone()
+    if isinstance(row, dict):
+        return list(row.values())[0]
+    return row[0]
+
+
+def _create_user_sessions(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_name VARCHAR(100) NOT NULL,
+            learning_language VARCHAR(50) NOT NULL,
+            native_language VARCHAR(50) NOT NULL,
+            proficiency_level VARCHAR(20) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            session_duration INT DEFAULT 0
+        )
+    ''')
+
+
+def _reconcile_user_sessions(cursor):
+    """
+    Bring tables created by src/main.py (``session_id``, no ``created_at``)
+    in line with the layout DatabaseManager uses
+    """
+    if _column_exists(cursor, 'user_sessions', 'session_id') and not _column_exists(cursor, 'user_sessions', 'id'):
+        # Foreign keys referencing the column follow the rename
+        cursor.execute("ALTER TABLE user_sessions RENAME COLUMN session_id TO id")
+    if not _column_exists(cursor, 'user_sessions', 'created_at'):
+        cursor.execute("ALTER TABLE user_sessions ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+    if not _column_exists(cursor, 'user_sessions', 'session_duration'):
+        cursor.execute("ALTER TABLE user_sessions ADD COLUMN session_duration INT DEFAULT 0")
+
+
+def _create_language_mistakes(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS language_mistakes (
+            mistake_id INT AUTO_INCREMENT PRIMARY KEY,
+            session_id INT,
+            mistake_type VARCHAR(50),
+            mistake_description TEXT,
+            correction TEXT,
+            FOREIGN KEY (session_id) REFERENCES user_sessions(id)
+        )
+    ''')
+
+
+def _add_indexes(cursor):
+    indexes = [
+        ('user_sessions', 'idx_user_sessions_created', ('created_at', 'id')),
+        ('user_sessions', 'idx_user_sessions_language_level', ('learning_language', 'proficiency_level')),
+        ('language_mistakes', 'idx_language_mistakes_session', ('session_id',)),
+    ]
+    for table, name, columns in indexes:
+        if not _index_exists(cursor, table, columns):
+            cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+
+
+def _create_session_id_sequence(cursor):
+    """
+    Block allocator for session ids
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_id_sequence (
+            name VARCHAR(50) PRIMARY KEY,
+            next_id BIGINT NOT NULL
+        )
+    ''')
+
+
+def _create_analytics_tables(cursor):
+    """
+    Summary tables kept up to date on every session insert (see
+    src/analytics.py), backfilled once from existing sessions
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_stats_daily (
+            day DATE NOT NULL,
+            learning_language VARCHAR(50) NOT NULL,
+            native_language VARCHAR(50) NOT NULL,
+            proficiency_level VARCHAR(20) NOT NULL,
+            sessions INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, learning_language, native_language, proficiency_level)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learner_days (
+            day DATE NOT NULL,
+            user_name VARCHAR(100) NOT NULL,
+            PRIMARY KEY (day, user_name)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_activity (
+            day DATE PRIMARY KEY,
+            sessions INT NOT NULL DEFAULT 0,
+            active_learners INT NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mistake_type_counts (
+            learning_language VARCHAR(50) NOT NULL,
+            mistake_type VARCHAR(50) NOT NULL,
+            mistakes INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (learning_language, mistake_type)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_watermarks (
+            name VARCHAR(50) PRIMARY KEY,
+            last_id BIGINT NOT NULL
+        )
+    ''')
+
+    # One-off backfill; from here on the tables are maintained incrementally
+    cursor.execute('''
+        INSERT IGNORE INTO session_stats_daily
+        (day, learning_language, native_language, proficiency_level, sessions)
+        SELECT DATE(created_at), learning_language, native_language, proficiency_level, COUNT(*)
+        FROM user_sessions
+        GROUP BY DATE(created_at), learning_language, native_language, proficiency_level
+    ''')
+    cursor.execute('''
+        INSERT IGNORE INTO learner_days (day, user_name)
+        SELECT DISTINCT DATE(created_at), user_name FROM user_sessions
+    ''')
+    cursor.execute('''
+        INSERT IGNORE INTO daily_activity (day, sessions, active_learners)
+        SELECT s.day, s.sessions, COALESCE(l.learners, 0)
+        FROM (SELECT day, SUM(sessions) AS sessions FROM session_stats_daily GROUP BY day) s
+        LEFT JOIN (SELECT day, COUNT(*) AS learners FROM learner_days GROUP BY day) l ON l.day = s.day
+    ''')
+
+
+def _structure_language_mistakes(cursor):
+    """
+    Store the mistaken fragment and index the "top mistake types" queries
+    """
+    if not _column_exists(cursor, 'language_mistakes', 'original_text'):
+        cursor.execute("ALTER TABLE language_mistakes ADD COLUMN original_text VARCHAR(255) AFTER mistake_type")
+    indexes = [
+        ('language_mistakes', 'idx_language_mistakes_session_type', ('session_id', 'mistake_type')),
+        ('user_sessions', 'idx_user_sessions_user', ('user_name',)),
+    ]
+    for table, name, columns in indexes:
+        if not _index_exists(cursor, table, columns):
+            cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+
+
+def _create_vocabulary_cards(cursor):
+    """
+    Spaced-repetition cards; due cards are read from an index on next_due
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vocabulary_cards (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_name VARCHAR(100) NOT NULL,
+            learning_language VARCHAR(50) NOT NULL,
+            term VARCHAR(100) NOT NULL,
+            meaning VARCHAR(255) NOT NULL,
+            session_id INT,
+            repetitions INT NOT NULL DEFAULT 0,
+            interval_days INT NOT NULL DEFAULT 0,
+            ease DECIMAL(4, 2) NOT NULL DEFAULT 2.50,
+            next_due DATETIME NOT NULL,
+            last_reviewed DATETIME NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_vocabulary_cards_term (user_name, learning_language, term),
+            INDEX idx_vocabulary_cards_due (user_name, learning_language, next_due),
+            FOREIGN KEY (session_id) REFERENCES user_sessions(id)
+        )
+    ''')
+
+
+def _create_conversation_tables(cursor):
+    """
+    Multi-turn conversation history and its running summary per session
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_turns (
+            session_id INT NOT NULL,
+            turn_index INT NOT NULL,
+            role VARCHAR(10) NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, turn_index),
+            FOREIGN KEY (session_id) REFERENCES user_sessions(id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            session_id INT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            summarized_turns INT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES user_sessions(id)
+        )
+    ''')
+
+
+
+def _add_session_idempotency(cursor):
+    """
+    Idempotency key of each session request, unique so resubmissions
+    upsert the existing row instead of inserting a new one
+    """
+    if not _column_exists(cursor, 'user_sessions', 'idempotency_key'):
+        cursor.execute("ALTER TABLE user_sessions ADD COLUMN idempotency_key CHAR(40) NULL")
+    if not _column_exists(cursor, 'user_sessions', 'duplicate_submissions'):
+        cursor.execute("ALTER TABLE user_sessions ADD COLUMN duplicate_submissions INT NOT NULL DEFAULT 0")
+    if not _index_exists(cursor, 'user_sessions', ('idempotency_key',)):
+        cursor.execute("CREATE UNIQUE INDEX uq_user_sessions_idempotency_key ON user_sessions (idempotency_key)")
+
+
+def _add_mistake_created_at(cursor):
+    """
+    Insert time of each mistake, read by the analytics watermark
+    """
+    if not _column_exists(cursor, 'language_mistakes', 'created_at'):
+        cursor.execute(
+            "ALTER TABLE language_mistakes ADD COLUMN created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"
+        )
+
+
+
+def _create_daily_mistake_counts(cursor):
+    """
+    Mistake counts per day, so the dashboard can filter them like sessions
+
+    Rows already folded into ``mistake_type_counts`` (up to the watermark)
+    are re-counted per day; the rest are left to the next refresh.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mistake_type_counts_daily (
+            day DATE NOT NULL,
+            learning_language VARCHAR(50) NOT NULL,
+            mistake_type VARCHAR(50) NOT NULL,
+            mistakes INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, learning_language, mistake_type)
+        )
+    ''')
+    cursor.execute('''
+        INSERT IGNORE INTO mistake_type_counts_daily (day, learning_language, mistake_type, mistakes)
+        SELECT DATE(m.created_at), s.learning_language, COALESCE(m.mistake_type, 'other'), COUNT(*)
+        FROM language_mistakes m
+        JOIN user_sessions s ON s.id = m.session_id
+        WHERE m.mistake_id <= COALESCE(
+            (SELECT last_id FROM analytics_watermarks WHERE name = 'language_mistakes'), 0
+        )
+        GROUP BY DATE(m.created_at), s.learning_language, COALESCE(m.mistake_type, 'other')
+    ''')
+    cursor.execute("DROP TABLE IF EXISTS mistake_type_counts")
+
+
+# Ordered forward migrations: (version, description, function(cursor))
+MIGRATIONS = [
+    (1, "Create user_sessions", _create_user_sessions),
+    (2, "Reconcile user_sessions with the DatabaseManager layout", _reconcile_user_sessions),
+    (3, "Create language_mistakes", _create_language_mistakes),
+    (4, "Index user_sessions and language_mistakes", _add_indexes),
+    (5, "Create session_id_sequence", _create_session_id_sequence),
+    (6, "Create and backfill analytics summary tables", _create_analytics_tables),
+    (7, "Add original_text and mistake type indexes to language_mistakes", _structure_language_mistakes),
+    (8, "Create vocabulary_cards", _create_vocabulary_cards),
+    (9, "Create conversation_turns and conversation_summaries", _create_conversation_tables),
+    (10, "Add a unique idempotency key to user_sessions", _add_session_idempotency),
+    (11, "Add created_at to language_mistakes", _add_mistake_created_at),
+    (12, "Replace mistake_type_counts with daily buckets", _create_daily_mistake_counts),
+]
+
+
+def current_version(cursor):
+    """
+    Highest applied migration version (0 for a fresh database)
+    """
+    cursor.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_migrations")
+    return _scalar(cursor)
+
+
+def run_migrations(connection):
+    """
+    Apply pending migrations in order, recording each in ``schema_migrations``
+
+    Args:
+        connection: Open mysql.connector connection
+
+    Returns:
+        list: Versions applied by this call
+    """
+    cursor = connection.cursor()
+    applied = []
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 30)", (MIGRATION_LOCK,))
+        if _scalar(cursor) != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            version = current_version(cursor)
+            for migration_version, description, migrate in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+                # DDL commits implicitly, so each step is recorded as soon as it succeeds
+                migrate(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (migration_version, description)
+                )
+                connection.commit()
+                applied.append(migration_version)
+                logger.info(f"Applied schema migration {migration_version}: {description}")
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+    return applied
+
+
+def verify_query_plans(connection, queries):
+    """
+    EXPLAIN queries and report any that scan the whole table or filesort
+
+    Very small tables may legitimately be scanned, so problems are reported
+    rather than raised.
+
+    Args:
+        connection: Open mysql.connector connection
+        queries (dict): Query name -> (sql, params)
+
+    Returns:
+        list: Human-readable descriptions of unindexed queries
+    """
+    problems = []
+    cursor = connection.cursor(dictionary=True)
+    try:
+        for name, (sql, params) in queries.items():
+            cursor.execute(f"EXPLAIN {sql}", params)
+            for step in cursor.fetchall():
+                extra = step.get('Extra') or ''
+                if step.get('type') == 'ALL' or 'Using filesort' in extra:
+                    problems.append(
+                        f"{name}: {step.get('type')} on {step.get('table')} "
+                        f"(key={step.get('key')}, extra={extra or '-'})"
+                    )
+    finally:
+        cursor.close()
+
+    for problem in problems:
+        logger.warning(f"Query is not index-backed: {problem}")
+    return problems
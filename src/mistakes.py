@@ -0,0 +1,370 @@
+import json
+import logging
+import re
+
+# Allowed values of language_mistakes.mistake_type
+MISTAKE_TYPES = (
+    'grammar', 'conjugation', 'agreement', 'word_order', 'vocabulary',
+    'spelling', 'punctuation', 'style', 'other'
+)
+
+# Schema-constrained output for input analysis (Gemini ``response_schema``)
+ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'corrected_sentence': {'type': 'string'},
+        'mistakes': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'type': {'type': 'string', 'enum': list(MISTAKE_TYPES)},
+                    'original': {'type': 'string'},
+                    'correction': {'type': 'string'},
+                    'explanation': {'type': 'string'}
+                },
+                'required': ['type', 'original', 'correction', 'explanation']
+            }
+        },
+        'tips': {'type': 'array', 'items': {'type': 'string'}}
+    },
+    'required': ['corrected_sentence', 'mistakes']
+}
+
+ANALYSIS_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': ANALYSIS_SCHEMA,
+    'temperature': 0.2,
+    'max_output_tokens': 800
+}
+
+# Several numbered sentences analyzed in one call
+BATCH_ANALYSIS_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {'number': {'type': 'integer'}, **ANALYSIS_SCHEMA['properties']},
+        'required': ['number'] + ANALYSIS_SCHEMA['required']
+    }
+}
+
+INSERT_MISTAKE_QUERY = '''
+INSERT INTO language_mistakes
+(session_id, mistake_type, original_text, mistake_description, correction)
+VALUES (%s, %s, %s, %s, %s)
+'''
+
+# Column limits of language_mistakes
+MAX_TYPE_LENGTH = 50
+MAX_ORIGINAL_LENGTH = 255
+
+
+class Mistake:
+    """
+    One learner mistake, as stored in ``language_mistakes``
+    """
+
+    __slots__ = ('mistake_type', 'original', 'correction', 'explanation')
+
+    def __init__(self, mistake_type, original, correction, explanation):
+        self.mistake_type = mistake_type
+        self.original = original
+        self.correction = correction
+        self.explanation = explanation
+
+    def __repr__(self):
+        return f"Mistake({self.mistake_type!r}, {self.original!r} -> {self.correction!r})"
+
+    def to_markdown(self):
+        """
+        Render the mistake as one list item
+        """
+        return (
+            f"- *{self.mistake_type.replace('_', ' ')}*: ~~{self.original}~~ → "
+            f"**{self.correction}** — {self.explanation}"
+        )
+
+
+class InputAnalysis:
+    """
+    Parsed, validated analysis of one learner sentence
+
+    ``approximate`` marks an analysis made for a similar sentence (a
+    near-duplicate memo hit) and ``offline`` one made by the rule-based
+    checker while the model is unavailable; neither has its mistakes recorded.
+    """
+
+    __slots__ = ('corrected_sentence', 'mistakes', 'tips', 'approximate', 'offline')
+
+    def __init__(self, corrected_sentence, mistakes, tips=None, approximate=False, offline=False):
+        self.corrected_sentence = corrected_sentence
+        self.mistakes = mistakes
+        self.tips = tips or []
+        self.approximate = approximate
+        self.offline = offline
+
+    def to_markdown(self):
+        """
+        Render the analysis for display
+        """
+        lines = [f"**Corrected sentence:** {self.corrected_sentence}", ""]
+        if self.mistakes:
+            lines.append("**Mistakes:**")
+            lines.extend(mistake.to_markdown() for mistake in self.mistakes)
+        else:
+            lines.append("No mistakes found. Well done!")
+        if self.tips:
+            lines.extend(["", "**Tips:**"])
+            lines.extend(f"- {tip}" for tip in self.tips)
+        return "\n".join(lines)
+
+
+def _text(value, limit=None):
+    text = ' '.join(str(value or '').split())
+    return text[:limit] if limit else text
+
+
+def parse_analysis(text):
+    """
+    Validate a JSON analysis against ``ANALYSIS_SCHEMA``
+
+    Unknown mistake types become ``other``; malformed mistake entries are
+    dropped.
+
+    Args:
+        text (str): Model output
+
+    Returns:
+        InputAnalysis: Parsed analysis
+
+    Raises:
+        ValueError: If the output is not a JSON object with a corrected sentence
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Analysis is not valid JSON: {e}") from None
+    return analysis_from_data(data)
+
+
+def mistake_from_data(entry):
+    """
+    Validate one decoded mistake object
+
+    Returns:
+        Mistake or None: None for malformed entries
+    """
+    if not isinstance(entry, dict) or not entry.get('original') or not entry.get('correction'):
+        return None
+    mistake_type = _text(entry.get('type')).lower().replace(' ', '_')
+    return Mistake(
+        mistake_type if mistake_type in MISTAKE_TYPES else 'other',
+        _text(entry['original'], MAX_ORIGINAL_LENGTH),
+        _text(entry['correction']),
+        _text(entry.get('explanation'))
+    )
+
+
+def analysis_from_data(data):
+    """
+    Validate one decoded analysis object (see ``parse_analysis``)
+
+    Raises:
+        ValueError: If it is not an object with a corrected sentence
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('corrected_sentence'), str):
+        raise ValueError("Analysis JSON has no corrected_sentence")
+
+    mistakes = [mistake for mistake in map(mistake_from_data, data.get('mistakes') or []) if mistake]
+    tips = [_text(tip) for tip in data.get('tips') or [] if isinstance(tip, str) and tip.strip()]
+    return InputAnalysis(_text(data['corrected_sentence']), mistakes, tips)
+
+
+def parse_batch_analysis(text, count):
+    """
+    Validate a JSON array of numbered analyses against ``BATCH_ANALYSIS_SCHEMA``
+
+    Entries with an out-of-range number or an invalid analysis are skipped.
+
+    Args:
+        text (str): Model output
+        count (int): Sentences in the batch
+
+    Returns:
+        dict: Sentence number (from 1) -> InputAnalysis
+
+    Raises:
+        ValueError: If the output is not a JSON array
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Batch analysis is not valid JSON: {e}") from None
+    if not isinstance(data, list):
+        raise ValueError("Batch analysis JSON is not an array")
+
+    analyses = {}
+    for entry in data:
+        try:
+            number = int(entry['number'])
+            analysis = analysis_from_data(entry)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 1 <= number <= count:
+            analyses[number] = analysis
+    return analyses
+
+
+class AnalysisStreamRenderer:
+    """
+    Render a streamed analysis JSON object as markdown while it arrives
+
+    The corrected sentence and each completed mistake are shown as soon as
+    they are in the buffer, in the layout of ``InputAnalysis.to_markdown``;
+    ``finish`` supplies the rest once the whole analysis is parsed.
+    """
+
+    CORRECTED_PATTERN = re.compile(r'"corrected_sentence"\s*:\s*("(?:[^"\\]|\\.)*")')
+    MISTAKES_PATTERN = re.compile(r'"mistakes"\s*:\s*\[')
+
+    def __init__(self):
+        self._buffer = ''
+        self._lines = []
+        self._mistakes_at = None
+        self._mistakes_done = False
+        self._decoder = json.JSONDecoder()
+
+    def _show(self, lines):
+        text = "\n".join(lines)
+        if self._lines:
+            text = "\n" + text
+        self._lines.extend(lines)
+        return text
+
+    def feed(self, chunk):
+        """
+        Add a response chunk
+
+        Returns:
+            str: Markdown to append to what was already shown ('' if none)
+        """
+        self._buffer += chunk
+        new_lines = []
+        if not self._lines:
+            match = self.CORRECTED_PATTERN.search(self._buffer)
+            if not match:
+                return ''
+            new_lines += [f"**Corrected sentence:** {_text(json.loads(match.group(1)))}", ""]
+
+        if self._mistakes_at is None and not self._mistakes_done:
+            match = self.MISTAKES_PATTERN.search(self._buffer)
+            if match:
+                self._mistakes_at = match.end()
+        while self._mistakes_at is not None:
+            position = self._mistakes_at
+            while position < len(self._buffer) and self._buffer[position] in ' \t\r\n,':
+                position += 1
+            if self._buffer.startswith(']', position):
+                self._mistakes_at = None
+                self._mistakes_done = True
+                break
+            try:
+                entry, position = self._decoder.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                # Mistake object not complete yet
+                break
+            self._mistakes_at = position
+            mistake = mistake_from_data(entry)
+            if mistake:
+                if "**Mistakes:**" not in self._lines and "**Mistakes:**" not in new_lines:
+                    new_lines.append("**Mistakes:**")
+                new_lines.append(mistake.to_markdown())
+        return self._show(new_lines) if new_lines else ''
+
+    def finish(self, analysis):
+        """
+        Markdown completing the rendering of the parsed analysis
+        """
+        shown = "\n".join(self._lines)
+        markdown = analysis.to_markdown()
+        if markdown.startswith(shown):
+            return markdown[len(shown):]
+        # The stream disagreed with the final parse; show the whole analysis
+        return "\n\n" + markdown
+
+
+class MistakeStore:
+    """
+    Writes parsed mistakes to ``language_mistakes`` and answers
+    "top mistake types" queries from its indexes
+    """
+
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager (DatabaseManager): Source of connections
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager
+
+    def record(self, session_id, mistakes):
+        """
+        Bulk-insert the mistakes of one session
+
+        Args:
+            session_id (int): Session the mistakes belong to
+            mistakes (list): Mistake records
+
+        Returns:
+            int: Rows inserted
+        """
+        if not mistakes:
+            return 0
+
+        # The mistakes reference the session row
+        self.db_manager.flush_write_behind()
+
+        rows = [
+            (session_id, mistake.mistake_type[:MAX_TYPE_LENGTH], mistake.original,
+             mistake.explanation, mistake.correction)
+            for mistake in mistakes
+        ]
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.executemany(INSERT_MISTAKE_QUERY, rows)
+            connection.commit()
+        self.logger.info(f"Recorded {len(rows)} mistakes for session {session_id}")
+        return len(rows)
+
+    def top_mistake_types(self, session_id=None, user_name=None, learning_language=None, limit=5):
+        """
+        Most frequent mistake types, optionally for one session, learner or
+        language (each filter is served by an index)
+
+        Returns:
+            list: (mistake_type, count) pairs, most frequent first
+        """
+        conditions = []
+        params = []
+        if session_id is not None:
+            conditions.append("m.session_id = %s")
+            params.append(session_id)
+        if user_name is not None:
+            conditions.append("s.user_name = %s")
+            params.append(user_name)
+        if learning_language is not None:
+            conditions.append("s.learning_language = %s")
+            params.append(learning_language)
+
+        needs_sessions = user_name is not None or learning_language is not None
+        join = "JOIN user_sessions s ON s.id = m.session_id" if needs_sessions else ""
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.execute(f'''
+                SELECT m.mistake_type, COUNT(*) AS mistakes
+                FROM language_mistakes m {join}
+                {where}
+                GROUP BY m.mistake_type
+                ORDER BY mistakes DESC
+                LIMIT %s
+            ''', tuple(params) + (limit,))
+            return [(mistake_type, int(count)) for mistake_type, count in cursor.fetchall()]
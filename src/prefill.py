@@ -0,0 +1,151 @@
+import argparse
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.chatbot import LanguageLearningChatbot
+from src.scene_cache import DEFAULT_CACHE_PATH, SceneCache
+from src.similarity import jaccard, shingles
+
+LEVELS = ['Beginner', 'Intermediate', 'Advanced']
+
+# Scenes at least this similar to a stored variant are discarded
+DUPLICATE_THRESHOLD = 0.8
+
+
+class ScenePrefiller:
+    """
+    Fills the scene cache with variants for language/level combinations
+
+    Every accepted scene is committed to the cache right away, so an
+    interrupted run picks up where it stopped: combinations that already
+    hold enough variants are skipped.
+    """
+
+    def __init__(self, chatbot, scene_cache, duplicate_threshold=DUPLICATE_THRESHOLD, max_attempts=2):
+        """
+        Args:
+            chatbot (LanguageLearningChatbot): Chatbot used for generation
+            scene_cache (SceneCache): Store the app serves scenes from
+            duplicate_threshold (float): Similarity above which a new scene
+                counts as a duplicate of a stored one
+            max_attempts (int): Generations tried per missing variant
+        """
+        self.logger = logging.getLogger(__name__)
+        self.chatbot = chatbot
+        self.scene_cache = scene_cache
+        self.duplicate_threshold = duplicate_threshold
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.generated = 0
+        self.duplicates = 0
+        self.failures = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def fill(self, learning_language, proficiency_level):
+        """
+        Generate the missing variants for one language and level
+
+        Scenes are stored under the model that generated them; the
+        combination is done once any model's key holds a full set, which is
+        what the chatbot's lookups (over the whole fallback chain) need.
+
+        Returns:
+            int: Scenes added to the cache
+        """
+        variants_per_key = self.scene_cache.variants_per_key
+        stored = {
+            cache_key: [shingles(scene) for scene in self.scene_cache.variants(cache_key)]
+            for cache_key in self.chatbot.scene_cache_keys(learning_language, proficiency_level)
+        }
+        missing = variants_per_key - max(len(known) for known in stored.values())
+
+        added = 0
+        for _ in range(max(0, missing) * self.max_attempts):
+            if any(len(known) >= variants_per_key for known in stored.values()):
+                break
+            try:
+                scene, cache_key = self.chatbot.generate_scene_entry(learning_language, proficiency_level)
+            except Exception as e:
+                self._count('failures')
+                self.logger.error(f"Prefill failed for {learning_language}/{proficiency_level}: {e}")
+                continue
+
+            known = stored.setdefault(cache_key, [])
+            scene_shingles = shingles(scene)
+            if any(jaccard(scene_shingles, other) >= self.duplicate_threshold for other in known):
+                self._count('duplicates')
+                continue
+
+            self.scene_cache.put(cache_key, scene)
+            known.append(scene_shingles)
+            added += 1
+            self._count('generated')
+        return added
+
+    def run(self, languages, levels, workers=2):
+        """
+        Fill every language/level combination using a bounded worker pool
+
+        Returns:
+            dict: Run summary with counts and throughput
+        """
+        combinations = [(language, level) for language in languages for level in levels]
+        started = time.monotonic()
+
+        # One task per combination, so workers never race on the same key
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self.fill, language, level): (language, level)
+                for language, level in combinations
+            }
+            for future in as_completed(futures):
+                language, level = futures[future]
+                print(f"   🔹 {language} / {level}: +{future.result()} scenes")
+
+        elapsed = time.monotonic() - started
+        return {
+            'combinations': len(combinations),
+            'generated': self.generated,
+            'duplicates': self.duplicates,
+            'failures': self.failures,
+            'elapsed_seconds': round(elapsed, 1),
+            'scenes_per_minute': round(self.generated / elapsed * 60, 1) if elapsed else 0.0
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate conversation scenes into the scene cache")
+    parser.add_argument('--api-key', default=os.getenv('GEMINI_API_KEY'), help="Gemini API key (default: GEMINI_API_KEY)")
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH, help="SQLite scene cache file")
+    parser.add_argument('--languages', nargs='+', default=LanguageLearningChatbot.SUPPORTED_LANGUAGES)
+    parser.add_argument('--levels', nargs='+', default=LEVELS)
+    parser.add_argument('--variants', type=int, default=3, help="Scenes to keep per language and level")
+    parser.add_argument('--workers', type=int, default=2, help="Concurrent generations (rate limits still apply)")
+    parser.add_argument('--duplicate-threshold', type=float, default=DUPLICATE_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("A Gemini API key is required (--api-key or GEMINI_API_KEY)")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    scene_cache = SceneCache(args.cache_path, variants=args.variants)
+    chatbot = LanguageLearningChatbot(api_key=args.api_key, scene_cache=scene_cache)
+    prefiller = ScenePrefiller(chatbot, scene_cache, duplicate_threshold=args.duplicate_threshold)
+
+    print(f"\n🗂️ Prefilling scenes into {args.cache_path} with {args.workers} workers...")
+    summary = prefiller.run(args.languages, args.levels, workers=args.workers)
+    print(
+        f"\n✅ {summary['generated']} scenes generated in {summary['elapsed_seconds']}s "
+        f"({summary['scenes_per_minute']} scenes/min), "
+        f"{summary['duplicates']} duplicates discarded, {summary['failures']} failures\n"
+    )
+    return 0 if summary['failures'] == 0 else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
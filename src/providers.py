@@ -0,0 +1,373 @@
+import hashlib
+import json
+import re
+import random
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Threads shared by hedged requests (the slower call finishes in the background)
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+# Serializes genai.configure with the first call that binds a model's client
+_genai_configure_lock = threading.Lock()
+
+
+class QuotaExceededError(Exception):
+    """
+    Simulated 429 raised by StubProvider, worded like Gemini's quota error
+    """
+
+
+class LLMResponse:
+    """
+    Provider-neutral response (or stream chunk) exposing ``text``
+    """
+
+    def __init__(self, text, provider=None, usage=None):
+        self.text = text
+        self.provider = provider
+        self.usage = usage or {}
+
+    def __repr__(self):
+        return f"LLMResponse(provider={self.provider!r}, text={self.text[:40]!r})"
+
+
+class LatencyStats:
+    """
+    Rolling window of call latencies for one provider
+    """
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, seconds, failed=False):
+        with self._lock:
+            self.calls += 1
+            if failed:
+                self.errors += 1
+            else:
+                self._samples.append(seconds)
+
+    def percentile(self, percent):
+        """
+        Latency percentile over the window
+
+        Returns:
+            float or None: Seconds, or None before any successful call
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95)
+        }
+
+
+class LLMProvider:
+    """
+    Base class for LLM backends
+
+    Subclasses implement ``_generate``; ``generate`` records latency. With
+    ``stream=True`` the result is an iterator of chunks, each with ``text``.
+    Complete responses are recorded in ``stats`` and the time to the start
+    of a stream in ``stream_stats``, so the much shorter stream start times
+    do not pull down the percentiles hedging relies on.
+    """
+
+    name = 'provider'
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.stats = LatencyStats()
+        self.stream_stats = LatencyStats()
+
+    def generate(self, prompt, generation_config=None, stream=False):
+        """
+        Send a prompt to the backend
+
+        Args:
+            prompt (str): Prompt text
+            generation_config (dict, optional): Gemini-style settings
+                (temperature, max_output_tokens, response_mime_type)
+            stream (bool): Return an iterator of chunks
+
+        Returns:
+            Response with ``text``, or an iterator of chunks when streaming
+        """
+        stats = self.stream_stats if stream else self.stats
+        started = time.monotonic()
+        try:
+            result = self._generate(prompt, generation_config or {}, stream)
+        except Exception:
+            stats.record(time.monotonic() - started, failed=True)
+            raise
+        stats.record(time.monotonic() - started)
+        return result
+
+    def _generate(self, prompt, generation_config, stream):
+        raise NotImplementedError
+
+    # Gemini-compatible alias so providers can stand in for a GenerativeModel
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        return self.generate(prompt, generation_config=generation_config, stream=stream)
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Google Gemini backend (google.generativeai)
+
+    ``genai.configure`` sets one process-wide key, and models bind the
+    default client lazily on their first call. A model for one key could
+    therefore send its requests (and quota) under another. A provider with
+    its own key makes its first call under a lock right after configuring
+    that key, so its model binds a client for it; later calls need no lock.
+    """
+
+    def __init__(self, model_name, api_key=None):
+        """
+        Args:
+            model_name (str): Gemini model name
+            api_key (str, optional): Key for this model's client; the
+                SDK's global configuration is used without one
+        """
+        super().__init__()
+        import google.generativeai as genai
+        self.name = model_name
+        self.api_key = api_key
+        self.model = genai.GenerativeModel(model_name)
+        self._client_bound = not api_key
+
+    def _generate(self, prompt, generation_config, stream):
+        kwargs = {'stream': stream} if stream else {}
+        if generation_config:
+            kwargs['generation_config'] = generation_config
+        if not self._client_bound:
+            with _genai_configure_lock:
+                if not self._client_bound:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    try:
+                        return self.model.generate_content(prompt, **kwargs)
+                    finally:
+                        # The client is bound before the request is sent
+                        self._client_bound = True
+        return self.model.generate_content(prompt, **kwargs)
+
+
+class GroqProvider(LLMProvider):
+    """
+    Groq chat completions backend
+    """
+
+    def __init__(self, client=None, model='llama-3.2-11b-vision-preview', api_key=None):
+        """
+        Args:
+            client (groq.Client, optional): Existing client
+            model (str): Groq model name
+            api_key (str, optional): Used to create a client when none is given
+        """
+        super().__init__()
+        if client is None:
+            import groq
+            client = groq.Client(api_key=api_key)
+        self.client = client
+        self.name = model
+
+    def _generate(self, prompt, generation_config, stream):
+        kwargs = {
+            'model': self.name,
+            'messages': [{"role": "user", "content": prompt}]
+        }
+        if 'temperature' in generation_config:
+            kwargs['temperature'] = generation_config['temperature']
+        if 'max_output_tokens' in generation_config:
+            kwargs['max_tokens'] = generation_config['max_output_tokens']
+        if generation_config.get('response_mime_type') == 'application/json':
+            kwargs['response_format'] = {"type": "json_object"}
+
+        if stream:
+            return self._stream(self.client.chat.completions.create(stream=True, **kwargs))
+
+        response = self.client.chat.completions.create(**kwargs)
+        usage = getattr(response, 'usage', None)
+        return LLMResponse(
+            response.choices[0].message.content,
+            provider=self.name,
+            usage={
+                'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+                'completion_tokens': getattr(usage, 'completion_tokens', None)
+            }
+        )
+
+    def _stream(self, chunks):
+        for chunk in chunks:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield LLMResponse(text, provider=self.name)
+
+
+def canned_response(prompt):
+    """
+    Canned answers shaped like the real model's, for load tests
+
+    Analysis prompts get schema-shaped JSON (an array for batched
+    prompts) reporting no mistakes; any other prompt gets a scene.
+    """
+    if '"corrected_sentence"' in prompt:
+        def analysis(sentence):
+            return {'corrected_sentence': sentence, 'mistakes': [], 'tips': ["Keep practicing!"]}
+
+        if '"number"' in prompt:
+            return json.dumps([
+                {'number': int(number), **analysis(sentence.strip())}
+                for number, sentence in re.findall(r'^\s*(\d+)\. (.*)$', prompt, re.MULTILINE)
+            ])
+        sentence = prompt.split('Input Sentence:', 1)[-1].split('\n', 1)[0].strip()
+        return json.dumps(analysis(sentence))
+    return (
+        "Scenario Context: Ordering at a café\n"
+        "Dialogue:\nPerson A: Hola, un café por favor.\nPerson B: Claro, ¿algo más?\n"
+        "Learning Objectives:\n- Ordering drinks\n"
+        "Key Vocabulary:\n- café: coffee\n- por favor: please\n"
+    )
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic local backend for tests, benchmarks and offline use
+
+    The same prompt always produces the same text. Latency is simulated
+    with ``latency`` seconds before the first token plus ``tokens_per_second``
+    for the rest of the response, and a share of calls can fail with a
+    quota error carrying a ``retry_delay``.
+    """
+
+    def __init__(self, name='stub', latency=0.0, tokens_per_second=None, response=None,
+                 quota_error_rate=0.0, retry_delay=1, seed=None):
+        """
+        Args:
+            name (str): Provider name
+            latency (float): Seconds before the response starts
+            tokens_per_second (float, optional): Simulated generation speed
+            response (str or callable, optional): Fixed text, or a function
+                of the prompt returning the text
+            quota_error_rate (float): Share of calls failing with a 429
+            retry_delay (int): Seconds suggested in the simulated 429
+            seed (int, optional): Seed for repeatable error injection
+        """
+        super().__init__()
+        self.name = name
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response = response
+        self.quota_error_rate = quota_error_rate
+        self.retry_delay = retry_delay
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _text(self, prompt):
+        if callable(self.response):
+            return self.response(prompt)
+        if self.response is not None:
+            return self.response
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        return f"Stub response {digest} for: {' '.join(prompt.split())[:80]}"
+
+    def _generate(self, prompt, generation_config, stream):
+        time.sleep(self.latency)
+        with self._random_lock:
+            quota_error = self._random.random() < self.quota_error_rate
+        if quota_error:
+            raise QuotaExceededError(
+                "429 You exceeded your current quota, please check your plan and billing details. "
+                f"retry_delay {{ seconds: {self.retry_delay} }}"
+            )
+        text = self._text(prompt)
+        tokens = text.split(' ')
+        if stream:
+            return self._stream(tokens)
+        if self.tokens_per_second:
+            time.sleep(len(tokens) / self.tokens_per_second)
+        return LLMResponse(text, provider=self.name, usage={'completion_tokens': len(tokens)})
+
+    def _stream(self, tokens):
+        for index, token in enumerate(tokens):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield LLMResponse(token if index == 0 else ' ' + token, provider=self.name)
+
+
+class HedgedProvider(LLMProvider):
+    """
+    Sends a prompt to a primary backend and, if it is slower than its own
+    p95 latency, also to a secondary; the first answer wins
+
+    Streaming requests are not hedged and go to the primary only.
+    """
+
+    def __init__(self, primary, secondary, default_hedge_delay=5.0, min_samples=20):
+        """
+        Args:
+            primary (LLMProvider): Preferred backend
+            secondary (LLMProvider): Backend raced against a slow primary
+            default_hedge_delay (float): Hedge delay until the primary has
+                ``min_samples`` latency samples
+            min_samples (int): Samples needed before trusting the p95
+        """
+        super().__init__()
+        self.primary = primary
+        self.secondary = secondary
+        self.name = primary.name
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.hedged = 0
+        self.secondary_wins = 0
+
+    def hedge_delay(self):
+        """
+        Seconds to wait for the primary before hedging
+        """
+        if len(self.primary.stats) < self.min_samples:
+            return self.default_hedge_delay
+        return self.primary.stats.percentile(95)
+
+    def _generate(self, prompt, generation_config, stream):
+        if stream:
+            return self.primary.generate(prompt, generation_config, stream=True)
+
+        primary = _hedge_executor.submit(self.primary.generate, prompt, generation_config)
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done:
+            return primary.result()
+
+        self.hedged += 1
+        secondary = _hedge_executor.submit(self.secondary.generate, prompt, generation_config)
+        pending = {primary, secondary}
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is secondary:
+                        self.secondary_wins += 1
+                    return future.result()
+                errors.append(future.exception())
+        raise errors[0]
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.getenv('SCENE_CACHE_PATH', 'scene_cache.db')
+
+# Process-wide caches, keyed by database path
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_scene_cache(path=DEFAULT_CACHE_PATH, **options):
+    """
+    Return the process-wide scene cache for a database path
+
+    Args:
+        path (str): SQLite file backing the cache
+        **options: Extra SceneCache settings used on first creation
+
+    Returns:
+        SceneCache: Shared cache
+    """
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = SceneCache(path, **options)
+            _caches[path] = cache
+        return cache
+
+
+class SceneCache:
+    """
+    Two-tier cache of generated conversation scenes
+
+    Scenes are kept in an in-memory LRU backed by a SQLite file, so they
+    survive restarts. Each key holds up to ``variants_per_key`` different
+    scenes; until that many exist, lookups miss so new variants get
+    generated, afterwards a random variant is served.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, variants=3, ttl=7 * 24 * 3600,
+                 max_entries=5000, memory_size=64):
+        """
+        Args:
+            path (str): SQLite file backing the cache
+            variants (int): Scenes kept per key
+            ttl (int): Seconds before a scene expires
+            max_entries (int): Maximum scenes kept on disk
+            memory_size (int): Keys kept in the in-memory tier
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.variants_per_key = variants
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS scenes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cache_key TEXT NOT NULL,
+                scene TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_scenes_key ON scenes (cache_key, created_at)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_scenes_created ON scenes (created_at)')
+        self._db.commit()
+
+    @staticmethod
+    def make_key(prompt, model_name, generation_config=None):
+        """
+        Build a cache key from everything that shapes the generated scene
+
+        Args:
+            prompt (str): Prompt sent to the model
+            model_name (str): Model that generates the scene
+            generation_config (dict, optional): Generation settings
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        payload = json.dumps(
+            [prompt, model_name, generation_config or {}],
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load(self, key):
+        """
+        Fresh variants for a key, from memory or disk (caller holds the lock)
+        """
+        cutoff = time.time() - self.ttl
+        entries = self._memory.get(key)
+        if entries is None:
+            rows = self._db.execute(
+                'SELECT scene, created_at FROM scenes WHERE cache_key = ? AND created_at >= ? '
+                'ORDER BY created_at',
+                (key, cutoff)
+            ).fetchall()
+            entries = [(created_at, scene) for scene, created_at in rows]
+
+        entries = [entry for entry in entries if entry[0] >= cutoff]
+        self._remember(key, entries)
+        return entries
+
+    def _remember(self, key, entries):
+        """
+        Keep a full set of variants in memory (caller holds the lock)
+
+        Incomplete sets are always re-read from disk, where other processes
+        such as the prefill job may have added variants since.
+        """
+        if len(entries) < self.variants_per_key:
+            self._memory.pop(key, None)
+            return
+        self._memory[key] = entries
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def variant_count(self, key):
+        """
+        Number of fresh scenes stored for a key
+        """
+        with self._lock:
+            return len(self._load(key))
+
+    def variants(self, key):
+        """
+        All fresh scenes stored for a key
+
+        Returns:
+            list: Scene texts, oldest first
+        """
+        with self._lock:
+            return [scene for _, scene in self._load(key)]
+
+    def get(self, key):
+        """
+        Return a cached scene once the key has its full set of variants
+
+        Args:
+            key (str): Cache key from ``make_key``
+
+        Returns:
+            str or None: A random variant, or None on a miss
+        """
+        with self._lock:
+            entries = self._load(key)
+        if len(entries) < self.variants_per_key:
+            return None
+        return random.choice(entries)[1]
+
+    def put(self, key, scene):
+        """
+        Store a newly generated scene, dropping the oldest surplus variants
+
+        Args:
+            key (str): Cache key from ``make_key``
+            scene (str): Generated scene text
+        """
+        now = time.time()
+        with self._lock:
+            entries = self._load(key)
+            entries.append((now, scene))
+            self._db.execute(
+                'INSERT INTO scenes (cache_key, scene, created_at) VALUES (?, ?, ?)',
+                (key, scene, now)
+            )
+
+            if len(entries) > self.variants_per_key:
+                del entries[:len(entries) - self.variants_per_key]
+                self._db.execute(
+                    'DELETE FROM scenes WHERE cache_key = ? AND created_at < ?',
+                    (key, entries[0][0])
+                )
+
+            self._remember(key, entries)
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+        """
+        Drop expired scenes and trim the store to ``max_entries`` (caller holds the lock)
+        """
+        self._db.execute('DELETE FROM scenes WHERE created_at < ?', (now - self.ttl,))
+        total = self._db.execute('SELECT COUNT(*) FROM scenes').fetchone()[0]
+        if total > self.max_entries:
+            self._db.execute(
+                'DELETE FROM scenes WHERE id IN '
+                '(SELECT id FROM scenes ORDER BY created_at LIMIT ?)',
+                (total - self.max_entries,)
+            )
+            # Memory copies may now reference evicted rows
+            self._memory.clear()
+            self.logger.info(f"Scene cache trimmed to {self.max_entries} entries")
+
+    def clear(self):
+        """
+        Remove every cached scene
+        """
+        with self._lock:
+            self._memory.clear()
+            self._db.execute('DELETE FROM scenes')
+            self._db.commit()
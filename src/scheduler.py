@@ -0,0 +1,291 @@
+import random
+import re
+import threading
+import time
+import logging
+from src.metrics import metrics
+
+# Server-sent retry hint, e.g. "retry_delay {\n  seconds: 14\n}"
+RETRY_DELAY_PATTERN = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)')
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Error message fragments worth retrying; status codes only as whole numbers,
+# so "1500 tokens" does not count as a 500
+RETRYABLE_PATTERN = re.compile(
+    r'\b(?:429|50[0234])\b|quota|resource exhausted|unavailable|deadline|timeout|timed out'
+)
+QUOTA_PATTERN = re.compile(r'\b429\b|quota')
+
+
+def status_code(error):
+    """
+    HTTP status carried by an LLM client exception, if any
+
+    Google API errors expose ``code`` and the Groq/OpenAI clients
+    ``status_code``; gRPC's ``code()`` method is ignored.
+
+    Returns:
+        int or None: Status code
+    """
+    for attribute in ('status_code', 'code'):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_quota_error(error):
+    """
+    Whether an LLM error means a rate limit or quota was exceeded
+    """
+    if type(error).__name__ in ('ResourceExhausted', 'TooManyRequests', 'RateLimitError'):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code == 429
+    return QUOTA_PATTERN.search(str(error).lower()) is not None
+
+
+def is_retryable(error):
+    """
+    Whether an LLM error is transient (quota, overload or timeout)
+
+    The exception's status code decides when it has one; otherwise the
+    message is matched against ``RETRYABLE_PATTERN``.
+    """
+    if is_quota_error(error):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUSES
+    return RETRYABLE_PATTERN.search(str(error).lower()) is not None
+
+
+def parse_retry_delay(error):
+    """
+    Extract the server-sent retry delay from an error, if any
+
+    Returns:
+        float or None: Seconds to wait before retrying
+    """
+    match = RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter for one model
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        """
+        Args:
+            rate_per_minute (float): Sustained requests per minute
+            burst (int, optional): Requests allowed back to back; defaults
+                to a tenth of the per-minute rate (at least 1)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(rate_per_minute // 10))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, max_wait=None):
+        """
+        Take a token, returning how long the caller must wait before using it
+
+        Args:
+            max_wait (float, optional): Longest acceptable wait; no token is
+                taken when the wait would be longer
+
+        Returns:
+            float or None: Seconds to wait (0 if a token is available now),
+                or None if the wait exceeds ``max_wait``
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            tokens = self.tokens - 1
+            wait = max(-tokens / self.rate if tokens < 0 else 0.0, self.blocked_until - now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens = tokens
+            return wait
+
+    def block(self, seconds):
+        """
+        Stop handing out tokens for a while (e.g. after a server retry_delay)
+        """
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def blocked_for(self):
+        """
+        Seconds left before the bucket accepts requests again
+        """
+        return max(0.0, self.blocked_until - time.monotonic())
+
+
+class RequestScheduler:
+    """
+    Shapes LLM traffic across a fallback list of models
+
+    Every call waits for a token from its model's bucket. Quota errors block
+    that model for the server's ``retry_delay`` and route the request to the
+    next model; when every model has failed, the round is retried with
+    jittered exponential backoff until the deadline.
+    """
+
+    def __init__(self, rate_limits=None, default_rate=60, max_retries=3,
+                 base_delay=1.0, max_delay=30.0, deadline=60.0):
+        """
+        Args:
+            rate_limits (dict, optional): Requests per minute by model name
+            default_rate (float): Requests per minute for unlisted models
+            max_retries (int): Extra rounds over the fallback list
+            base_delay (float): First backoff delay in seconds
+            max_delay (float): Cap on a single backoff delay
+            deadline (float): Seconds after which a request gives up
+        """
+        self.logger = logging.getLogger(__name__)
+        self.rate_limits = dict(rate_limits or {})
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.quota_errors = 0
+        self.fallbacks = 0
+
+    def bucket(self, model_name):
+        """
+        Token bucket for a model, created on first use
+        """
+        with self._lock:
+            bucket = self._buckets.get(model_name)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_limits.get(model_name, self.default_rate))
+                self._buckets[model_name] = bucket
+            return bucket
+
+    def _wait(self, seconds):
+        """
+        Sleep while counted as queued
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            metrics.set_gauge('llm_queue_depth', self.queue_depth)
+        try:
+            time.sleep(seconds)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+                self.total_wait_seconds += seconds
+            metrics.observe('llm_queue_wait_seconds', seconds)
+
+    def _backoff(self, attempt):
+        """
+        Jittered exponential backoff delay for a retry round
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def run(self, call, model_names):
+        """
+        Run an LLM call, honoring rate limits, retry delays and fallbacks
+
+        Args:
+            call (callable): ``call(model_name)`` performing the request
+            model_names (list): Models to try, preferred first
+
+        Returns:
+            tuple: (model_name, result) of the first successful call
+        """
+        deadline_at = time.monotonic() + self.deadline
+        with self._lock:
+            self.requests += 1
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retryable = False
+            for position, model_name in enumerate(model_names):
+                bucket = self.bucket(model_name)
+                if bucket.blocked_for() > 0 and position < len(model_names) - 1:
+                    # Model is cooling down after a quota error; try the next one
+                    continue
+
+                wait = bucket.reserve(max_wait=deadline_at - time.monotonic())
+                if wait is None:
+                    continue
+                self._wait(wait)
+
+                try:
+                    return model_name, call(model_name)
+                except Exception as error:
+                    last_error = error
+                    retryable = retryable or is_retryable(error)
+                    if is_quota_error(error):
+                        delay = parse_retry_delay(error) or self._backoff(attempt)
+                        bucket.block(delay)
+                        with self._lock:
+                            self.quota_errors += 1
+                        metrics.increment('llm_quota_errors_total', model=model_name)
+                        self.logger.warning(f"Quota exceeded for {model_name}; blocked for {delay:.0f}s")
+                    else:
+                        self.logger.warning(f"Model {model_name} call failed: {error}")
+                    if position < len(model_names) - 1:
+                        with self._lock:
+                            self.fallbacks += 1
+                        metrics.increment('llm_fallbacks_total', model=model_name)
+
+            if last_error is not None and not retryable:
+                break
+
+            # Wait for the earliest model to cool down, or back off
+            cooldown = min(self.bucket(name).blocked_for() for name in model_names)
+            delay = cooldown if cooldown > 0 else self._backoff(attempt)
+            if attempt == self.max_retries or time.monotonic() + delay > deadline_at:
+                break
+            with self._lock:
+                self.retries += 1
+            metrics.increment('llm_retries_total')
+            self._wait(delay)
+
+        raise last_error or TimeoutError("LLM request deadline exceeded while waiting for quota")
+
+    def stats(self):
+        """
+        Snapshot of the scheduler counters
+
+        Returns:
+            dict: Counter values
+        """
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'total_wait_seconds': round(self.total_wait_seconds, 3),
+                'requests': self.requests,
+                'retries': self.retries,
+                'quota_errors': self.quota_errors,
+                'fallbacks': self.fallbacks
+            }
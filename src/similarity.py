@@ -0,0 +1,144 @@
+import random
+import re
+import unicodedata
+import zlib
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Modulus for MinHash permutations
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def shingles(text, size=5):
+    """
+    Character n-grams of a text with case and whitespace normalized
+
+    Args:
+        text (str): Input text
+        size (int): Characters per shingle
+
+    Returns:
+        set: Distinct shingles
+    """
+    text = _WHITESPACE.sub(' ', text.lower()).strip()
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(first, second):
+    """
+    Jaccard similarity of two shingle sets
+
+    Returns:
+        float: Similarity between 0 and 1
+    """
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def exact_text(text):
+    """
+    Canonical form of a sentence for exact-match lookups
+
+    Only Unicode NFC and whitespace collapsing are applied: case and
+    punctuation may be the very mistakes being analyzed.
+
+    Returns:
+        str: Canonical text
+    """
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def normalize_text(text):
+    """
+    Loose form of a sentence for near-duplicate comparison
+
+    Applies Unicode NFKC, case folding, punctuation removal and whitespace
+    collapsing. Accents are kept: "esta" and "está" are different answers.
+
+    Returns:
+        str: Normalized text
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ''.join(' ' if unicodedata.category(char).startswith('P') else char for char in text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class MinHasher:
+    """
+    MinHash signatures of shingle sets; the share of equal signature
+    positions estimates the Jaccard similarity of two sets
+    """
+
+    def __init__(self, num_perm=64, seed=1):
+        """
+        Args:
+            num_perm (int): Hash functions per signature
+            seed (int): Seed for the hash function parameters
+        """
+        generator = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [
+            (generator.randrange(1, _MERSENNE_PRIME), generator.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingle_set):
+        """
+        Returns:
+            tuple: ``num_perm`` minimum hash values
+        """
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set] or [0]
+        return tuple(
+            min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+            for a, b in self._params
+        )
+
+
+class MinHashLSH:
+    """
+    Locality-sensitive index over MinHash signatures
+
+    Signatures are cut into ``bands``; items sharing any whole band are
+    returned as candidates, so lookups touch a few buckets instead of
+    comparing against every item.
+    """
+
+    def __init__(self, num_perm=64, bands=8):
+        """
+        Args:
+            num_perm (int): Signature length (must be divisible by ``bands``)
+            bands (int): More bands find less similar candidates
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets = {}
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def insert(self, key, signature):
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key, signature):
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, signature):
+        """
+        Returns:
+            set: Keys of candidate near-duplicates
+        """
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        return candidates
@@ -0,0 +1,201 @@
+import re
+import logging
+from datetime import datetime, timedelta
+
+# SM-2 defaults
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# Review grades offered to learners (SM-2 quality 0-5)
+REVIEW_GRADES = {'Again': 1, 'Hard': 3, 'Good': 4, 'Easy': 5}
+
+VOCABULARY_HEADER = re.compile(r'^\s*(?:#+\s*|\d+[.)]\s*)?[*_]*key\s+vocabulary', re.IGNORECASE)
+# Bulleted entry; ``**`` opens bold text, not a bullet
+VOCABULARY_ENTRY = re.compile(r'^\s*(?:[-•]|\*(?!\*)|\d+[.)])\s*(.+?)\s*(?::|\s[-–—]\s)\s*(.+?)\s*$')
+MARKDOWN_EMPHASIS = re.compile(r'[*_`]+')
+# Non-bullet ``Label:`` or ``Label: text`` line starting the next section
+SECTION_LABEL = re.compile(r'^\s*\w[\w\s/&()\'-]{0,50}:(?:\s|$)')
+
+# Column limits of vocabulary_cards
+MAX_TERM_LENGTH = 100
+MAX_MEANING_LENGTH = 255
+
+CARD_COLUMNS = ['id', 'term', 'meaning', 'repetitions', 'interval_days', 'ease', 'next_due']
+
+INSERT_CARD_QUERY = '''
+INSERT IGNORE INTO vocabulary_cards
+(user_name, learning_language, term, meaning, session_id, next_due)
+VALUES (%s, %s, %s, %s, %s, %s)
+'''
+
+# Served by idx_vocabulary_cards_due (user_name, learning_language, next_due)
+DUE_CARDS_QUERY = f'''
+SELECT {', '.join(CARD_COLUMNS)} FROM vocabulary_cards
+WHERE user_name = %s AND learning_language = %s AND next_due <= %s
+ORDER BY next_due LIMIT %s
+'''
+
+
+def parse_key_vocabulary(scene_text):
+    """
+    Extract ``[Word/Phrase]: [Meaning]`` entries from a scene's Key Vocabulary
+    section
+
+    Returns:
+        list: (term, meaning) pairs in scene order, without duplicates
+    """
+    entries = []
+    seen = set()
+    in_section = False
+    for line in (scene_text or '').splitlines():
+        if VOCABULARY_HEADER.match(line):
+            in_section = True
+            continue
+        if not in_section or not line.strip():
+            continue
+
+        match = VOCABULARY_ENTRY.match(line)
+        if match is None:
+            plain = MARKDOWN_EMPHASIS.sub('', line).strip()
+            if plain.startswith('#') or SECTION_LABEL.match(plain):
+                # Next section
+                break
+            continue
+
+        term = MARKDOWN_EMPHASIS.sub('', match.group(1)).strip(' []')[:MAX_TERM_LENGTH]
+        meaning = MARKDOWN_EMPHASIS.sub('', match.group(2)).strip(' []')[:MAX_MEANING_LENGTH]
+        if term and meaning and term.lower() not in seen:
+            seen.add(term.lower())
+            entries.append((term, meaning))
+    return entries
+
+
+def sm2(repetitions, interval_days, ease, quality):
+    """
+    Apply one SM-2 review
+
+    Args:
+        repetitions (int): Successful reviews in a row
+        interval_days (int): Current interval in days
+        ease (float): Current ease factor
+        quality (int): Recall quality, 0 (blackout) to 5 (perfect)
+
+    Returns:
+        tuple: (repetitions, interval_days, ease) after the review
+    """
+    quality = max(0, min(5, quality))
+    if quality < 3:
+        repetitions, interval_days = 0, 1
+    else:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease)
+        repetitions += 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return repetitions, interval_days, round(ease, 2)
+
+
+class VocabularyCard:
+    """
+    One vocabulary card with its SM-2 state
+    """
+
+    __slots__ = tuple(CARD_COLUMNS)
+
+    def __init__(self, id, term, meaning, repetitions=0, interval_days=0, ease=DEFAULT_EASE, next_due=None):
+        self.id = id
+        self.term = term
+        self.meaning = meaning
+        self.repetitions = repetitions
+        self.interval_days = interval_days
+        self.ease = float(ease)
+        self.next_due = next_due
+
+    def __repr__(self):
+        return f"VocabularyCard({self.term!r}, due={self.next_due})"
+
+
+class VocabularyStore:
+    """
+    Per-learner vocabulary cards built from generated scenes, reviewed
+    locally with SM-2 (no LLM calls)
+    """
+
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager (DatabaseManager): Source of connections
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager
+
+    def add_from_scene(self, session_id, user_name, learning_language, scene_text):
+        """
+        Create cards for the scene's Key Vocabulary, skipping terms the
+        learner already has
+
+        Returns:
+            int: Cards created
+        """
+        entries = parse_key_vocabulary(scene_text)
+        if not entries:
+            return 0
+        now = datetime.now()
+
+        # The cards reference the session row
+        self.db_manager.flush_write_behind()
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.executemany(INSERT_CARD_QUERY, [
+                (user_name, learning_language, term, meaning, session_id, now)
+                for term, meaning in entries
+            ])
+            created = max(cursor.rowcount or 0, 0)
+            connection.commit()
+        self.logger.info(f"Added {created} vocabulary cards for {user_name}")
+        return created
+
+    def due_cards(self, user_name, learning_language, limit=10, now=None):
+        """
+        Cards due for review, most overdue first (an index range read)
+
+        Returns:
+            list: VocabularyCard objects
+        """
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.execute(DUE_CARDS_QUERY, (user_name, learning_language, now or datetime.now(), limit))
+            return [VocabularyCard(*row) for row in cursor.fetchall()]
+
+    def review(self, card_id, quality, now=None):
+        """
+        Record a review and schedule the card's next one
+
+        Args:
+            card_id (int): Card reviewed
+            quality (int): SM-2 recall quality, 0-5 (see REVIEW_GRADES)
+
+        Returns:
+            datetime or None: When the card is due next; None if it does not exist
+        """
+        now = now or datetime.now()
+        with self.db_manager.cursor(dictionary=False) as (connection, cursor):
+            cursor.execute(
+                "SELECT repetitions, interval_days, ease FROM vocabulary_cards WHERE id = %s FOR UPDATE",
+                (card_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                connection.commit()
+                return None
+
+            repetitions, interval_days, ease = sm2(row[0], row[1], float(row[2]), quality)
+            next_due = now + timedelta(days=interval_days)
+            cursor.execute('''
+                UPDATE vocabulary_cards
+                SET repetitions = %s, interval_days = %s, ease = %s, next_due = %s, last_reviewed = %s
+                WHERE id = %s
+            ''', (repetitions, interval_days, ease, next_due, now, card_id))
+            connection.commit()
+        return next_due
@@ -0,0 +1,272 @@
+import atexit
+import threading
+import time
+import logging
+from collections import deque
+from src.analytics import record_sessions
+from src.metrics import metrics
+
+INSERT_SESSION_QUERY = '''
+INSERT INTO user_sessions
+(id, user_name, learning_language, native_language, proficiency_level, idempotency_key)
+VALUES (%s, %s, %s, %s, %s, %s)
+'''
+
+
+class BufferFullError(Exception):
+    """
+    Raised when the write-behind buffer cannot take more sessions
+    """
+
+
+class SessionIdAllocator:
+    """
+    Hands out session ids from blocks reserved in ``session_id_sequence``
+
+    Every session insert, synchronous or buffered, takes its id from here,
+    so reserved ids never collide without any DDL on the request path.
+    Blocks start past ``MAX(id)`` to skip rows inserted with AUTO_INCREMENT
+    before the allocator was used.
+    """
+
+    def __init__(self, db_manager, block_size=100):
+        """
+        Args:
+            db_manager (DatabaseManager): Source of connections
+            block_size (int): Ids reserved per database round trip
+        """
+        self.db_manager = db_manager
+        self.block_size = block_size
+        self._next_id = 0
+        self._end_id = 0
+        self._lock = threading.Lock()
+
+    def _reserve_block(self):
+        """
+        Reserve ``block_size`` ids that no other writer will use
+        """
+        with self.db_manager.checkout() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(
+                    "INSERT IGNORE INTO session_id_sequence (name, next_id) VALUES ('user_sessions', 1)"
+                )
+                cursor.execute(
+                    "SELECT next_id FROM session_id_sequence WHERE name = 'user_sessions' FOR UPDATE"
+                )
+                next_id = cursor.fetchone()[0]
+                cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM user_sessions")
+                start = max(next_id, cursor.fetchone()[0])
+                end = start + self.block_size
+                cursor.execute(
+                    "UPDATE session_id_sequence SET next_id = %s WHERE name = 'user_sessions'",
+                    (end,)
+                )
+                connection.commit()
+                return start, end
+            finally:
+                cursor.close()
+
+    def next_id(self):
+        """
+        Next reserved session id, reserving a new block when needed
+        """
+        with self._lock:
+            if self._next_id >= self._end_id:
+                self._next_id, self._end_id = self._reserve_block()
+            session_id = self._next_id
+            self._next_id += 1
+            return session_id
+
+
+class SessionWriteBehind:
+    """
+    Buffers session rows in memory and inserts them in batches
+
+    A background thread flushes the buffer with ``executemany`` whenever
+    ``batch_size`` rows are waiting or ``flush_interval`` has passed. Failed
+    flushes keep the rows and retry with backoff; the buffer is bounded by
+    ``max_buffer`` and drained at interpreter shutdown.
+    """
+
+    def __init__(self, db_manager, batch_size=50, flush_interval=0.5, max_buffer=10000,
+                 block_size=100, max_retry_delay=30.0, allocator=None):
+        """
+        Args:
+            db_manager (DatabaseManager): Pooled database manager to write through
+            batch_size (int): Rows per INSERT batch
+            flush_interval (float): Maximum seconds a row waits before a flush
+            max_buffer (int): Maximum rows held while MySQL is unavailable
+            block_size (int): Session ids reserved per allocation
+            max_retry_delay (float): Cap on the backoff between failed flushes
+            allocator (SessionIdAllocator, optional): Shared id allocator;
+                a new one with ``block_size`` is used otherwise
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_retry_delay = max_retry_delay
+        self.allocator = allocator or SessionIdAllocator(db_manager, block_size=block_size)
+        self._pending = deque()
+        # Idempotency key -> id of the buffered row holding it
+        self._pending_keys = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="session-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    @property
+    def pending(self):
+        """
+        Rows waiting to be written
+        """
+        with self._condition:
+            return len(self._pending)
+
+    def submit(self, user_name, learning_language, native_language, proficiency_level, idempotency_key=None):
+        """
+        Queue a session row and return its reserved id immediately
+
+        A row already buffered under ``idempotency_key`` is reused instead;
+        keys already written are answered by the caller's TTL map, so no
+        database round trip happens here beyond id block reservations.
+
+        Returns:
+            int: Session id the row will be written with
+
+        Raises:
+            BufferFullError: If ``max_buffer`` rows are already waiting
+        """
+        with self._condition:
+            if idempotency_key in self._pending_keys:
+                return self._pending_keys[idempotency_key]
+            if len(self._pending) >= self.max_buffer:
+                raise BufferFullError(f"{len(self._pending)} sessions are waiting to be written")
+
+        session_id = self.allocator.next_id()
+        with self._condition:
+            if idempotency_key in self._pending_keys:
+                # Queued by another thread while the id was reserved
+                return self._pending_keys[idempotency_key]
+            self._pending.append(
+                (session_id, user_name, learning_language, native_language, proficiency_level, idempotency_key)
+            )
+            if idempotency_key is not None:
+                self._pending_keys[idempotency_key] = session_id
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        return session_id
+
+    def _resolve_conflicts(self, cursor, batch):
+        """
+        Split a batch against rows already in ``user_sessions``
+
+        A row whose id is taken cannot be written and is dropped with an
+        error. A row whose idempotency key another process wrote meanwhile
+        is still written under its id (already handed out and referenced by
+        later rows) but without the key, and the key is pointed at the
+        surviving session.
+
+        Returns:
+            tuple: (rows to insert, {idempotency key: surviving id})
+        """
+        ids = [row[0] for row in batch]
+        keys = [row[5] for row in batch if row[5] is not None]
+        query = f"SELECT id, idempotency_key FROM user_sessions WHERE id IN ({', '.join(['%s'] * len(ids))})"
+        if keys:
+            query += f" OR idempotency_key IN ({', '.join(['%s'] * len(keys))})"
+        cursor.execute(query, ids + keys)
+        existing = cursor.fetchall()
+        taken_ids = {row[0] for row in existing}
+        surviving = {row[1]: row[0] for row in existing if row[1] is not None}
+
+        rows = []
+        for row in batch:
+            if row[0] in taken_ids:
+                self.logger.error(f"Dropping queued session {row[0]} for {row[1]}: the id is already used")
+                metrics.increment('db_rows_failed_total')
+            elif row[5] in surviving:
+                rows.append(row[:5] + (None,))
+            else:
+                rows.append(row)
+        return rows, {key: surviving[key] for key in keys if key in surviving}
+
+    def flush(self):
+        """
+        Write up to one batch of buffered rows
+
+        Returns:
+            int: Rows taken from the buffer
+
+        Raises:
+            Exception: Database errors; the rows stay buffered
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if not batch:
+                return 0
+
+            try:
+                with metrics.span('db_flush'), self.db_manager.cursor(dictionary=False) as (connection, cursor):
+                    rows, surviving = self._resolve_conflicts(cursor, batch)
+                    if rows:
+                        cursor.executemany(INSERT_SESSION_QUERY, rows)
+                        record_sessions(cursor, [row[1:5] for row in rows])
+                    connection.commit()
+            except Exception:
+                with self._condition:
+                    # Put the batch back in its original order
+                    self._pending.extendleft(reversed(batch))
+                raise
+
+            with self._condition:
+                for row in batch:
+                    if self._pending_keys.get(row[5]) == row[0]:
+                        del self._pending_keys[row[5]]
+            for idempotency_key, session_id in surviving.items():
+                # Later requests with the key get the session written first
+                self.db_manager.remember_session(idempotency_key, session_id)
+            if surviving:
+                self.logger.warning(
+                    f"{len(surviving)} queued sessions repeat sessions written meanwhile; stored without their key"
+                )
+            metrics.increment('db_rows_flushed_total', len(rows))
+            self.logger.info(f"Flushed {len(rows)} sessions")
+            return len(batch)
+
+    def _run(self):
+        retry_delay = 0.0
+        while True:
+            with self._condition:
+                if self._stopping.is_set() and not self._pending:
+                    return
+                if len(self._pending) < self.batch_size and not self._stopping.is_set():
+                    self._condition.wait(self.flush_interval)
+
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+                retry_delay = 0.0
+            except Exception as e:
+                retry_delay = min(self.max_retry_delay, max(1.0, retry_delay * 2))
+                self.logger.error(f"Session flush failed, retrying in {retry_delay:.1f}s: {e}")
+                if self._stopping.is_set():
+                    self.logger.error(f"Dropping {self.pending} unwritten sessions at shutdown")
+                    return
+                time.sleep(retry_delay)
+
+    def stop(self, timeout=10):
+        """
+        Flush everything still buffered and stop the background thread
+        """
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        with self._condition:
+            self._condition.notify()
+        self._thread.join(timeout)